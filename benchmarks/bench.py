@@ -0,0 +1,394 @@
+import argparse
+import json
+import platform
+import random as rnd
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from simulation.game import GameNaive
+from simulation.nbasim import NBASim
+from simulation.tournament import Playoffs, PlayoffsBatch
+from utls.games_data import load_games_data
+from utls.playoffs import get_playoffs
+
+SEED = 42
+DATA_PATH = Path(__file__).parents[1] / "data"
+SEASON_TO_PLAY = 2018
+SEASON_DATA = 2017
+ROOT = Path(__file__).parents[1]
+# Name: (main.py arguments, time budget in seconds, modules it must not import) of
+# the short runs timed by measure_startup. The budgets are a report of the benchmark,
+# the tests only check them when asked for, see tests/test_startup.py.
+STARTUP_RUNS = {
+    "help": (["--help"], 1.0, ["numba", "pandas", "scipy"]),
+    "playoffs_artifact": (
+        ["1000", str(SEASON_TO_PLAY), str(SEASON_TO_PLAY), "True", "--artifact"],
+        3.0,
+        ["numba", "pandas"],
+    ),
+}
+# Runs main.py, then prints the imported modules when the interpreter exits, also
+# after the SystemExit of --help.
+MODULES_WRAPPER = (
+    "import atexit, runpy, sys; "
+    "atexit.register("
+    "lambda: print('modules:', *sorted(sys.modules), file=sys.stderr)); "
+    "sys.argv = sys.argv[1:]; "
+    "runpy.run_path(sys.argv[0], run_name='__main__')"
+)
+
+
+def _seed():
+    rnd.seed(SEED)
+    np.random.seed(SEED)
+
+
+def _sim(**kwargs):
+    """Build a simulation of the benchmark seasons on the shared games data."""
+    games_data = load_games_data(DATA_PATH, seasons=[SEASON_TO_PLAY, SEASON_DATA])
+    season_data = SEASON_TO_PLAY if kwargs.get("playoffs_only") else SEASON_DATA
+    return NBASim(
+        DATA_PATH,
+        SEASON_TO_PLAY,
+        season_data,
+        seed=SEED,
+        games_data=games_data,
+        **kwargs,
+    )
+
+
+def bench_game_single():
+    sim = _sim()
+    gsim = GameNaive(False)
+    teams = [sim.teams.dteams[t] for t in sim.teams.teams_names[:2]]
+
+    def run(n):
+        for _ in range(n):
+            gsim.play(*teams)
+
+    return run, 5000
+
+
+def bench_game_batch():
+    sim = _sim()
+    gsim = GameNaive(False)
+    state = gsim.initial_state(sim.teams)
+    home_ids, away_ids = sim.season._games_idx(sim.teams)
+    rng = np.random.default_rng(SEED)
+
+    def run(n):
+        # n games, in calendars of the regular season games.
+        size = (max(n // len(home_ids), 1), len(home_ids))
+        gsim.play_batch(
+            np.broadcast_to(home_ids, size), np.broadcast_to(away_ids, size), state, rng
+        )
+
+    return run, 1230 * 1000
+
+
+def bench_season_scalar():
+    sim = _sim()
+
+    def run(n):
+        for _ in range(n):
+            sim.season.play_regular_season(sim.teams)
+
+    return run, 20
+
+
+def bench_season_block():
+    sim = _sim(block_size=1000)
+
+    def run(n):
+        sim.season.play_regular_seasons(sim.teams, n)
+
+    return run, 1000
+
+
+def bench_season_update():
+    sim = _sim(block_size=1000, teams_update=True)
+
+    def run(n):
+        sim.season.play_regular_seasons(sim.teams, n)
+
+    return run, 200
+
+
+def bench_standings():
+    sim = _sim()
+    ylabel = np.asarray(sim.calendar_ylabel)
+
+    def run(n):
+        for _ in range(n):
+            sim.standings.get_playoffs(ylabel)
+
+    return run, 200
+
+
+def bench_standings_pandas():
+    sim = _sim()
+    calendar = sim.season_calendar.copy()
+    teams_info = sim.teams_info
+
+    def run(n):
+        for _ in range(n):
+            get_playoffs(calendar, teams_info)
+
+    return run, 5
+
+
+def bench_playoffs_scalar():
+    sim = _sim(playoffs_only=True)
+    season_teams_ranked, _ = sim.standings.get_playoffs(sim.calendar_ylabel)
+
+    def run(n):
+        for _ in range(n):
+            Playoffs(season_teams_ranked, sim.gsim).get_winner(sim.teams)
+
+    return run, 5000
+
+
+def bench_playoffs_batch():
+    sim = _sim(playoffs_only=True)
+    season_teams_ranked, _ = sim.standings.get_playoffs(sim.calendar_ylabel)
+    seeds = PlayoffsBatch.seeds_array([season_teams_ranked], sim.teams.team_ids)
+    playoffs = PlayoffsBatch(sim.gsim.matchup_table(sim.teams), sim.rng)
+
+    def run(n):
+        playoffs.play(np.repeat(seeds, n, axis=0))
+
+    return run, 100000
+
+
+def bench_simulation_playoffs_only():
+    sim = _sim(playoffs_only=True)
+
+    def run(n):
+        sim.play_simulation(n, progress=False)
+
+    return run, 100000
+
+
+def bench_simulation_season():
+    sim = _sim()
+
+    def run(n):
+        sim.play_simulation(n, progress=False)
+
+    return run, 20
+
+
+def bench_simulation_season_block():
+    sim = _sim(block_size=1000)
+
+    def run(n):
+        sim.play_simulation(n, progress=False)
+
+    return run, 2000
+
+
+# Name: (setup returning the function to time and its number of iterations, unit).
+BENCHMARKS = {
+    "game_single": (bench_game_single, "games"),
+    "game_batch": (bench_game_batch, "games"),
+    "season_scalar": (bench_season_scalar, "seasons"),
+    "season_block": (bench_season_block, "seasons"),
+    "season_update": (bench_season_update, "seasons"),
+    "standings": (bench_standings, "seasons"),
+    "standings_pandas": (bench_standings_pandas, "seasons"),
+    "playoffs_scalar": (bench_playoffs_scalar, "playoffs"),
+    "playoffs_batch": (bench_playoffs_batch, "playoffs"),
+    "simulation_playoffs_only": (bench_simulation_playoffs_only, "iterations"),
+    "simulation_season": (bench_simulation_season, "iterations"),
+    "simulation_season_block": (bench_simulation_season_block, "iterations"),
+}
+
+
+def run_benchmark(name, repeat=3):
+    """Time a benchmark, seeded before each run. The best time of the runs is kept, and
+    the peak memory is measured in an extra run as tracemalloc slows the code down.
+
+    Args:
+        name (str): Name of the benchmark, see BENCHMARKS.
+        repeat (int, optional): Number of timed runs. Defaults to 3.
+
+    Returns:
+        dict: Number of iterations, best time in seconds, throughput in iterations per
+        second and peak memory in MB.
+    """
+    setup, unit = BENCHMARKS[name]
+    _seed()
+    run, n_iter = setup()
+    times = []
+    for _ in range(repeat):
+        _seed()
+        start = time.perf_counter()
+        run(n_iter)
+        times.append(time.perf_counter() - start)
+    _seed()
+    tracemalloc.start()
+    run(n_iter)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = min(times)
+    return {
+        "unit": unit,
+        "n_iter": n_iter,
+        "seconds": best,
+        "per_second": n_iter / best,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def _run_main(args, modules=False):
+    """Run main.py in a new interpreter.
+
+    Args:
+        args (list(str)): Arguments of main.py.
+        modules (bool, optional): Report the imported modules. Defaults to False.
+
+    Returns:
+        tuple(float, set(str)): Wall time in seconds, imported top-level modules if
+        modules.
+    """
+    command = [sys.executable] + (["-c", MODULES_WRAPPER] if modules else [])
+    start = time.perf_counter()
+    process = subprocess.run(
+        command + [str(ROOT / "main.py")] + args,
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    seconds = time.perf_counter() - start
+    imported = set()
+    for line in process.stderr.splitlines():
+        if line.startswith("modules:"):
+            imported = {name.split(".")[0] for name in line.split()[1:]}
+    return seconds, imported
+
+
+def measure_startup(repeat=3, names=None, data_path=None):
+    """Time the short runs of main.py from the interpreter start, the best of repeat
+    runs being kept, and list the forbidden modules they import. A first run prepares
+    the season artifact if needed.
+
+    Args:
+        repeat (int, optional): Number of timed runs. Defaults to 3.
+        names (list(str), optional): Runs of STARTUP_RUNS to time. Defaults to None
+        (all of them).
+        data_path (str, optional): Data folder of the runs, see main.py --data-path.
+        Defaults to None (the data folder of the repository).
+
+    Returns:
+        dict: Best time in seconds, time budget and forbidden modules imported by run
+        name.
+    """
+    results = {}
+    for name in names or STARTUP_RUNS:
+        args, budget, forbidden = STARTUP_RUNS[name]
+        if data_path is not None:
+            args = args + ["--data-path", str(data_path)]
+        _, modules = _run_main(args, modules=True)
+        times = [_run_main(args)[0] for _ in range(repeat)]
+        results[name] = {
+            "seconds": min(times),
+            "budget": budget,
+            "forbidden": sorted(modules.intersection(forbidden)),
+        }
+    return results
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def print_results(results, baseline=None):
+    """Print the results, with the speedup against a baseline run if given.
+
+    Args:
+        results (dict): Results by benchmark name, see run_benchmark.
+        baseline (dict, optional): Results of a previous run. Defaults to None.
+    """
+    for name, res in results.items():
+        line = (
+            f"{name:<26}{res['per_second']:>14,.1f} {res['unit']}/s"
+            f"{res['peak_mb']:>10.1f} MB"
+        )
+        if baseline is not None and name in baseline:
+            line += f"{res['per_second'] / baseline[name]['per_second']:>8.2f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Time the hot paths of the simulation on the data folder with fixed "
+        "seeds, and save the throughputs and peak memories in a json file."
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        help=f"Benchmarks to run, among {', '.join(BENCHMARKS)}. Defaults to all of "
+        "them.",
+    )
+    parser.add_argument("--output", help="Save the results in this json file.")
+    parser.add_argument(
+        "--compare", help="Print the speedups against the results of this json file."
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Number of timed runs of a benchmark."
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Instead of the benchmarks, time the --help and playoffs only artifact "
+        "runs of main.py from the interpreter start, and fail if one takes longer "
+        "than its budget or imports one of its forbidden modules.",
+    )
+
+    args = parser.parse_args()
+    if args.startup:
+        failed = False
+        for name, res in measure_startup(repeat=args.repeat).items():
+            print(
+                f"{name:<26}{res['seconds']:>10.3f} s / {res['budget']:.1f} s  "
+                f"imports {res['forbidden']}"
+            )
+            failed |= res["seconds"] > res["budget"] or bool(res["forbidden"])
+        sys.exit(1 if failed else 0)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks {sorted(unknown)}.")
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+    results = {}
+    for name in args.benchmarks or BENCHMARKS:
+        results[name] = run_benchmark(name, repeat=args.repeat)
+        print_results({name: results[name]}, baseline)
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps({"metadata": _metadata(), "results": results}, indent=2)
+        )
@@ -1,28 +1,12 @@
 import os
 import argparse
-import random as rnd
-import numpy as np
 from pathlib import Path
-from simulation.nbasim import NBASim
-from utls.results import process_results
+from utls.cli import boolean_string, check_positive, check_probability
 
 
 SEED = 42
 
 
-def check_positive(value):
-    ivalue = int(value)
-    if ivalue <= 0:
-        raise argparse.ArgumentTypeError("%s is an invalid positive int value" % value)
-    return ivalue
-
-
-def boolean_string(s):
-    if s not in {"False", "True"}:
-        raise ValueError("Not a valid boolean string")
-    return s == "True"
-
-
 def check_parameters(n_iter, season_to_play, season_data, playoffs_only):
     ok = True
     if season_data > season_to_play:
@@ -79,31 +63,331 @@ if __name__ == "__main__":
     parser.add_argument(
         "--save", help="Save the results in the data folder.", action="store_true"
     )
+    parser.add_argument(
+        "--data-path",
+        type=Path,
+        default=data_path,
+        help="Data folder, where the games data are read and the artifacts and "
+        "results are written. Defaults to the data folder of the repository.",
+    )
+    parser.add_argument(
+        "--method",
+        choices=["naive", "bootstrap", "elo"],
+        default="naive",
+        help="Game model: normal scores sampled from the teams scores (naive), scores "
+        "drawn from the teams past scores (bootstrap), or results drawn from the teams "
+        "Elo ratings computed on season_data (elo).",
+    )
+    parser.add_argument(
+        "--elo-history",
+        help="With the elo method, rate the teams from the Elo history of all the games "
+        "of the data folder, built or updated first, instead of season_data games only.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--block-size",
+        type=check_positive,
+        default=None,
+        help="Play the regular seasons by blocks of this number of iterations at once.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=check_positive,
+        default=1,
+        help="Number of processes to split the simulations across.",
+    )
+    parser.add_argument(
+        "--teams-update",
+        help="Update the teams scores after each regular season game.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--kernel",
+        help="Play the regular seasons with teams updates game by game with the "
+        "compiled kernel of the naive method. Without Numba, a warning is printed "
+        "and they are played round by round.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--artifact",
+        help="Use the precompiled season artifact of the data folder, preparing it if "
+        "needed.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Run the simulations by chunks and save the partial results in this json "
+        "file after each chunk.",
+    )
+    parser.add_argument(
+        "--chunk",
+        type=check_positive,
+        default=10000,
+        help="Number of simulations of a chunk when using a checkpoint.",
+    )
+    parser.add_argument(
+        "--resume",
+        help="Resume the simulations from the checkpoint file if it exists.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--ci-target",
+        type=check_probability,
+        default=None,
+        help="Run the simulations by chunks until every team probability of winning "
+        "has a confidence interval half-width below this value (e.g. 0.005), n_iter "
+        "being the maximum number of simulations.",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=check_probability,
+        default=0.95,
+        help="Confidence level of the intervals used with --ci-target.",
+    )
+    parser.add_argument(
+        "--details",
+        help="Also print the seeds, playoffs rounds and regular season wins "
+        "distributions of the teams, saved in extra csv files with --save.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--as-of",
+        default=None,
+        help="Keep the real results of the regular season games played at this cutoff, "
+        "a date (YYYY-MM-DD, games before it) or a game id (games up to it), and "
+        "simulate only the remaining ones.",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Print the wall time and number of calls of each phase of the run.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="With --profile, also save a cProfile profile of the run if the file ends "
+        "with .prof, or else a speedscope timeline of the phases in this json file.",
+    )
+    parser.add_argument(
+        "--results-store",
+        help="Write the champion, playoffs seeds, regular season wins and playoffs "
+        "rounds of every simulation to parquet files in this folder.",
+    )
+    parser.add_argument(
+        "--from-store",
+        help="Rebuild the results from the folder of --results-store instead of "
+        "running the simulations.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--exact",
+        help="Compute the exact probabilities of winning instead of running the "
+        "simulations, from the matchup probabilities of the game model (any method). "
+        "Only available if playoffs_only is True.",
+        action="store_true",
+    )
 
     args = parser.parse_args()
+    data_path = args.data_path
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint.")
+    if args.method == "elo" and args.artifact:
+        parser.error("--artifact is not available with the elo method.")
+    if args.elo_history and args.method != "elo":
+        parser.error("--elo-history requires --method elo.")
+    if args.kernel and (args.method != "naive" or not args.teams_update):
+        parser.error("--kernel requires --teams-update and the naive method.")
+    if args.exact and not args.playoffs_only:
+        parser.error("--exact requires playoffs_only to be True.")
+    if args.as_of and args.playoffs_only:
+        parser.error("--as-of requires playoffs_only to be False.")
+    if args.profile_output and not args.profile:
+        parser.error("--profile-output requires --profile.")
+    if args.from_store and not args.results_store:
+        parser.error("--from-store requires --results-store.")
+    if args.results_store and (args.exact or args.resume):
+        parser.error("--results-store is not available with --exact or --resume.")
+    if (
+        args.results_store
+        and not args.from_store
+        and os.path.isdir(args.results_store)
+        and os.listdir(args.results_store)
+    ):
+        parser.error(f"The results store {args.results_store} is not empty.")
     check = check_parameters(
         args.n_iter, args.season_to_play, args.season_data, args.playoffs_only
     )
 
     if check:
+        # Imported once the arguments are checked, so that --help and wrong arguments
+        # do not pay for numpy and the simulation modules.
+        import cProfile
+        import random as rnd
+        import numpy as np
+        from simulation.elo_calc import build_elo_history
+        from simulation.nbasim import NBASim
+        from utls.checkpoint import load_checkpoint, save_checkpoint
+        from utls.counters import SimulationCounters
+        from utls.profiler import NullProfiler, PhaseProfiler
+        from utls.results import (
+            max_half_width,
+            print_partial_results,
+            process_probabilities,
+            process_results,
+        )
+        from utls.season_artifact import load_season_artifact, prepare_season_artifact
+
         rnd.seed(SEED)
         np.random.seed(SEED)
-        print(
-            f"Starting {args.n_iter} simulations to get probabilities of winning the championship:"
-        )
-        sim = NBASim(
-            data_path,
-            args.season_to_play,
-            args.season_data,
-            playoffs_only=args.playoffs_only,
-        )
-        results = sim.play_simulation(args.n_iter)
+        profiler = NullProfiler()
+        cprofile = None
+        if args.profile:
+            cprofile_output = (args.profile_output or "").endswith(".prof")
+            profiler = PhaseProfiler(
+                record_events=bool(args.profile_output) and not cprofile_output
+            )
+            if cprofile_output:
+                cprofile = cProfile.Profile()
+                cprofile.enable()
+        if args.exact:
+            print("Computing exact probabilities of winning the championship:")
+        elif args.from_store:
+            print(f"Rebuilding the results from {args.results_store}:")
+        else:
+            print(
+                f"Starting {args.n_iter} simulations to get probabilities of winning the championship:"
+            )
+        if args.from_store:
+            # The results are only read from the store, without loading the games.
+            from utls.result_store import load_results_store
+
+            results, n_done, counters = load_results_store(args.results_store)
+        else:
+            artifact = None
+            if args.artifact:
+                artifact = load_season_artifact(
+                    data_path, args.season_to_play, args.season_data
+                )
+                if artifact is None:
+                    prepare_season_artifact(
+                        data_path, args.season_to_play, args.season_data
+                    )
+                    artifact = load_season_artifact(
+                        data_path, args.season_to_play, args.season_data
+                    )
+            elo_history = None
+            if args.elo_history:
+                elo_history = build_elo_history(data_path)
+            try:
+                sim = NBASim(
+                    data_path,
+                    args.season_to_play,
+                    args.season_data,
+                    method=args.method,
+                    playoffs_only=args.playoffs_only,
+                    seed=SEED,
+                    block_size=args.block_size,
+                    teams_update=args.teams_update,
+                    artifact=artifact,
+                    elo_history=elo_history,
+                    as_of=args.as_of,
+                    kernel=args.kernel,
+                    profiler=profiler,
+                )
+            except ValueError as e:
+                parser.error(str(e))
+            store = None
+            if args.results_store:
+                store = sim.new_results_store(args.results_store)
+            if args.exact:
+                results = sim.playoffs_probabilities()
+            elif args.checkpoint or args.ci_target:
+                params = {
+                    "season_to_play": args.season_to_play,
+                    "season_data": args.season_data,
+                    "playoffs_only": args.playoffs_only,
+                    "method": args.method,
+                    "elo_history": args.elo_history,
+                    "block_size": args.block_size,
+                    "teams_update": args.teams_update,
+                    "kernel": sim.kernel,
+                    "as_of": args.as_of,
+                    "workers": args.workers,
+                    "chunk": args.chunk,
+                }
+                results, n_done = None, 0
+                if args.resume and os.path.exists(args.checkpoint):
+                    checkpoint = load_checkpoint(args.checkpoint)
+                    if checkpoint["params"] != params:
+                        parser.error(
+                            f"The checkpoint was made with other parameters: "
+                            f"{checkpoint['params']}."
+                        )
+                    results, n_done = checkpoint["final_wins"], checkpoint["n_done"]
+                    sim.set_random_state(checkpoint["random_state"])
+                    if checkpoint.get("counters") is not None:
+                        sim.counters = SimulationCounters.from_dict(
+                            checkpoint["counters"]
+                        )
+                    print(f"Resuming after {n_done} simulations.")
+
+                def end_of_chunk(n_done, results):
+                    if args.checkpoint:
+                        save_checkpoint(
+                            args.checkpoint,
+                            params,
+                            n_done,
+                            results,
+                            sim.get_random_state(),
+                            sim.counters.to_dict(),
+                        )
+                    print_partial_results(results, n_done, args.n_iter)
+
+                results, n_done = sim.play_adaptive(
+                    args.ci_target,
+                    args.n_iter,
+                    chunk=args.chunk,
+                    workers=args.workers,
+                    confidence=args.confidence,
+                    final_wins=results,
+                    n_done=n_done,
+                    store=store,
+                    callback=end_of_chunk,
+                )
+                if args.ci_target:
+                    half_width = max_half_width(results, n_done, args.confidence)
+                    print(f"Confidence intervals half-width {half_width:.4f}.")
+            else:
+                results = sim.play_simulation(
+                    args.n_iter, workers=args.workers, store=store
+                )
+                n_done = args.n_iter
+            counters = sim.counters
         if args.save:
+            run_name = "exact" if args.exact else f"n_iter_{n_done}"
+            if args.as_of:
+                run_name += f"_as_of_{args.as_of}"
             save_path = (
                 data_path
-                / f"n_iter_{args.n_iter}_season_to_play_{args.season_to_play}_season_data_"
+                / f"{run_name}_season_to_play_{args.season_to_play}_season_data_"
                 f"{args.season_data}_playoffs_only_{args.playoffs_only}.csv"
             )
         else:
             save_path = None
-        process_results(results, args.n_iter, save_path=save_path)
+        with profiler.phase("results"):
+            if args.exact:
+                process_probabilities(results, save_path=save_path)
+            else:
+                process_results(
+                    results,
+                    n_done,
+                    save_path=save_path,
+                    confidence=args.confidence if args.ci_target else None,
+                    counters=counters if args.details else None,
+                )
+        if args.profile:
+            print(profiler.summary())
+            if cprofile is not None:
+                cprofile.disable()
+                cprofile.dump_stats(args.profile_output)
+            elif args.profile_output:
+                profiler.to_speedscope(args.profile_output)
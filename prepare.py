@@ -0,0 +1,28 @@
+import argparse
+from pathlib import Path
+from utls.season_artifact import prepare_season_artifact
+
+if __name__ == "__main__":
+
+    data_path = Path(__file__).parent / "data"
+
+    parser = argparse.ArgumentParser(
+        description="Compile the regular season calendar and the teams data of a season "
+        "pair into an artifact of the data folder, used by main.py --artifact."
+    )
+    parser.add_argument(
+        "season_to_play",
+        type=int,
+        choices=[2016, 2017, 2018],
+        help="Season to simulate.",
+    )
+    parser.add_argument(
+        "season_data",
+        type=int,
+        choices=[2016, 2017, 2018],
+        help="Season data to use to perform the simulations.",
+    )
+
+    args = parser.parse_args()
+    path = prepare_season_artifact(data_path, args.season_to_play, args.season_data)
+    print(f"Season artifact prepared in {path}")
@@ -1,5 +1,16 @@
+import json
+import os
+from pathlib import Path
+import numpy as np
+
 K = 20
 HOME_ADVANTAGE = 100
+INITIAL_ELO = 1500
+# Part of the rating kept from one season to the next, the rest being regressed to the
+# initial rating.
+SEASON_CARRY_OVER = 0.75
+ELO_HISTORY_FILE = "EloHistory.snappy.parquet"
+GAMES_FILE = "BasketRefGames.snappy.parquet"
 
 
 def elo_pred(elo1, elo2):
@@ -16,3 +27,164 @@ def elo_update(w_elo, l_elo, margin):
     mult = ((margin + 3.0) ** 0.8) / expected_margin(elo_diff)
     update = K * mult * (1 - pred)
     return (pred, update)
+
+
+def season_regression(elo):
+    return SEASON_CARRY_OVER * elo + (1 - SEASON_CARRY_OVER) * INITIAL_ELO
+
+
+def _replay_games(season, home_id, away_id, home_pts, away_pts, ratings, last_season):
+    """Replay games in chronological order, updating the ratings of the teams. Plain
+    lists are used, which are faster than arrays to process one game at a time.
+
+    Args:
+        season (list(int)): Season of each game.
+        home_id (list(int)): Home team id of each game.
+        away_id (list(int)): Away team id of each game.
+        home_pts (list(int)): Home team score of each game.
+        away_pts (list(int)): Away team score of each game.
+        ratings (list(float)): Ratings of the teams before the games, indexed by team
+        id. Updated in place.
+        last_season (int): Season of the game before the first one, None if there is
+        not any.
+
+    Returns:
+        tuple(list(float), list(float), list(float), list(float)): Home and away teams
+        ratings before each game, home and away teams ratings after each game.
+    """
+    n_games = len(season)
+    home_pre, away_pre = [0.0] * n_games, [0.0] * n_games
+    home_post, away_post = [0.0] * n_games, [0.0] * n_games
+    for i in range(n_games):
+        if season[i] != last_season:
+            if last_season is not None:
+                ratings[:] = [season_regression(r) for r in ratings]
+            last_season = season[i]
+        h, a = home_id[i], away_id[i]
+        home_elo, away_elo = ratings[h], ratings[a]
+        if home_pts[i] > away_pts[i]:
+            _, update = elo_update(
+                home_elo + HOME_ADVANTAGE, away_elo, home_pts[i] - away_pts[i]
+            )
+        else:
+            _, update = elo_update(
+                away_elo, home_elo + HOME_ADVANTAGE, away_pts[i] - home_pts[i]
+            )
+            update = -update
+        ratings[h] = home_elo + update
+        ratings[a] = away_elo - update
+        home_pre[i], away_pre[i] = home_elo, away_elo
+        home_post[i], away_post[i] = ratings[h], ratings[a]
+    return home_pre, away_pre, home_post, away_post
+
+
+def build_elo_history(data_path, history_path=None):
+    """Replay all the games of the data folder in game_id order to build the Elo rating
+    of each team before and after each game, the ratings being regressed toward the
+    initial rating between two seasons. Teams are the franchises ids of the games
+    table. If the history file already exists, only the games after its last one are
+    replayed and appended, starting from the final ratings stored in its metadata.
+
+    Args:
+        data_path (str): Path to the data folder.
+        history_path (str, optional): Path of the history parquet file. Defaults to
+        None, then ELO_HISTORY_FILE of the data folder is used.
+
+    Returns:
+        pa.Table: Elo history with game_id, season, home_id, away_id, home_elo_pre,
+        away_elo_pre, home_elo_post and away_elo_post columns.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    if history_path is None:
+        history_path = Path(data_path) / ELO_HISTORY_FILE
+    history, ratings, last_season, game_filter = None, [], None, None
+    if os.path.exists(history_path):
+        history = pq.read_table(history_path)
+        state = json.loads(history.schema.metadata[b"elo_state"])
+        ratings, last_season = state["ratings"], state["season"]
+        game_filter = ds.field("game_id") > state["game_id"]
+
+    columns = [
+        "game_id",
+        "season",
+        "home_id",
+        "away_id",
+        "home_ftscore",
+        "away_ftscore",
+    ]
+    games = ds.dataset(Path(data_path) / GAMES_FILE).to_table(
+        columns=columns, filter=game_filter
+    )
+    if games.num_rows == 0:
+        return history
+    order = np.argsort(games["game_id"].to_numpy(zero_copy_only=False), kind="stable")
+    games = games.take(pa.array(order))
+    cols = {c: games[c].to_numpy(zero_copy_only=False) for c in columns}
+    n_teams = int(max(cols["home_id"].max(), cols["away_id"].max())) + 1
+    ratings += [INITIAL_ELO] * (n_teams - len(ratings))
+    home_pre, away_pre, home_post, away_post = _replay_games(
+        cols["season"].tolist(),
+        cols["home_id"].tolist(),
+        cols["away_id"].tolist(),
+        cols["home_ftscore"].tolist(),
+        cols["away_ftscore"].tolist(),
+        ratings,
+        last_season,
+    )
+    new_history = pa.table(
+        {
+            "game_id": cols["game_id"].astype(str),
+            "season": cols["season"].astype(np.int16),
+            "home_id": cols["home_id"].astype(np.int16),
+            "away_id": cols["away_id"].astype(np.int16),
+            "home_elo_pre": np.array(home_pre, dtype=np.float32),
+            "away_elo_pre": np.array(away_pre, dtype=np.float32),
+            "home_elo_post": np.array(home_post, dtype=np.float32),
+            "away_elo_post": np.array(away_post, dtype=np.float32),
+        }
+    )
+    if history is not None:
+        new_history = pa.concat_tables([history.replace_schema_metadata(), new_history])
+    # Exact final ratings, to append the next games without reading the whole history.
+    state = {
+        "ratings": ratings,
+        "season": int(cols["season"][-1]),
+        "game_id": str(cols["game_id"][-1]),
+    }
+    new_history = new_history.replace_schema_metadata({"elo_state": json.dumps(state)})
+    tmp_path = f"{history_path}.tmp"
+    pq.write_table(new_history, tmp_path, compression="snappy")
+    os.replace(tmp_path, history_path)
+    return new_history
+
+
+def season_final_ratings(history, season):
+    """Get the rating of each team after its last game of a season.
+
+    Args:
+        history (pa.Table): Elo history, see build_elo_history.
+        season (int): Season.
+
+    Returns:
+        dict: Dictionnary of k: v with k the team id and v its rating.
+    """
+    import pyarrow.compute as pc
+
+    season_games = history.filter(pc.equal(history["season"], season))
+    team_ids = np.concatenate(
+        [season_games["home_id"].to_numpy(), season_games["away_id"].to_numpy()]
+    )
+    post = np.concatenate(
+        [
+            season_games["home_elo_post"].to_numpy(),
+            season_games["away_elo_post"].to_numpy(),
+        ]
+    )
+    game_idx = np.tile(np.arange(season_games.num_rows), 2)
+    # Games in reverse order, so that np.unique finds the last game of each team.
+    order = np.argsort(-game_idx, kind="stable")
+    teams, last = np.unique(team_ids[order], return_index=True)
+    return dict(zip(teams.tolist(), post[order][last].astype(float).tolist()))
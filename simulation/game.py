@@ -1,23 +1,139 @@
-import pandas as pd
 import random as rnd
+import warnings
+from abc import ABC, abstractmethod
 import numpy as np
+from .elo_calc import HOME_ADVANTAGE, elo_pred, elo_update, expected_margin
+from .teams import TeamsState
 
 
-class GameNaive:
-    """Game class to play a game between two teams. Scores for each one are sampled
-    from a normal distribution using their past season scores.
+def _gather(values, ids):
+    """Gather the values of the teams playing the games.
 
     Args:
-        teams_update (bool): Either to update the teams scores after a game or not.
+        values (np.array): Values of shape (n_teams,), or (n_iter, n_teams) to use
+        different values by iteration.
+        ids (np.array(int)): Teams ids of shape (n_games,) or (n_iter, n_games).
+
+    Returns:
+        np.array: Values of the teams, of the broadcast shape of the ids and of the
+        iterations.
     """
+    if values.ndim == 1:
+        return values[ids]
+    ids = np.broadcast_to(ids, values.shape[:1] + ids.shape[-1:])
+    return np.take_along_axis(values, ids, axis=-1)
 
-    HADVG = 1
 
-    def __init__(self, teams_update=True):
+class GameModel(ABC):
+    """Interface of the game models. Games are played by batches on integer teams ids,
+    so that the games of a full calendar can be played for many iterations at once.
+    The strength of the teams is stored in a state specific to each model, either the
+    one of the teams as they are (initial_state), or one copy by iteration
+    (new_state) updated after each game (update_state).
+
+    Args:
+        teams_update (bool, optional): Either to update the teams after each game
+        during a regular season, see Season. Defaults to False.
+        hadvg (float, optional): Home advantage of the model, in its own unit. Defaults
+        to None, then the HADVG of the model is used.
+    """
+
+    HADVG = 0
+
+    def __init__(self, teams_update=False, hadvg=None):
         self.teams_update = teams_update
+        if hadvg is not None:
+            self.HADVG = hadvg
+
+    @abstractmethod
+    def initial_state(self, teams):
+        """Get the state of the teams as they are.
+
+        Args:
+            teams (Teams): Teams object storing the different teams of the season.
+
+        Returns:
+            State of the teams, indexed by team id.
+        """
+
+    @abstractmethod
+    def new_state(self, teams, n_iter):
+        """Create the state of the teams for n_iter iterations, updated by
+        update_state.
+
+        Args:
+            teams (Teams): Teams object storing the different teams of the season.
+            n_iter (int): Number of iterations.
+
+        Returns:
+            State of the teams of each iteration.
+        """
+
+    @abstractmethod
+    def update_state(self, state, home_ids, away_ids, home_pts, away_pts, home_win):
+        """Update the state of each iteration with the results of games where each team
+        plays at most once.
+
+        Args:
+            state: State of the teams of each iteration, see new_state.
+            home_ids (np.array(int)): Home teams ids of shape (n_games,).
+            away_ids (np.array(int)): Away teams ids of shape (n_games,).
+            home_pts (np.array(int)): Home teams scores of shape (n_iter, n_games).
+            away_pts (np.array(int)): Away teams scores of shape (n_iter, n_games).
+            home_win (np.array(int)): 1 if home team wins else 0, of shape (n_iter,
+            n_games).
+        """
+
+    def play_seasons(self, home_ids, away_ids, teams, n_iter, rng):
+        """Play full calendars with a compiled kernel, updating the teams after each
+        game.
+
+        Args:
+            home_ids (np.array(int)): Home teams ids of shape (n_games,).
+            away_ids (np.array(int)): Away teams ids of shape (n_games,).
+            teams (Teams): Teams object storing the different teams of the season.
+            n_iter (int): Number of iterations.
+            rng (np.random.Generator): Random generator seeding the kernel.
+
+        Returns:
+            tuple(np.array(int), np.array(int), np.array(int)): Home teams scores, away
+            teams scores and 1 if home team wins else 0, of shape (n_iter, n_games).
+            None if the model has no compiled kernel or does not use it, the games
+            being then played by batches with play_batch and update_state.
+        """
+        return None
+
+    def matchup_table(self, teams):
+        """Get the matchup probabilities of the teams under the model.
+
+        Args:
+            teams (Teams): Teams object storing the different teams of the season.
+
+        Returns:
+            MatchupTable: Matchup probabilities, indexed by team id.
+        """
+        return teams.matchup_table(self.HADVG)
+
+    @abstractmethod
+    def play_batch(self, home_ids, away_ids, state, rng):
+        """Simulate many games at once.
+
+        Args:
+            home_ids (np.array(int)): Home teams ids, of shape (n_games,) or (n_iter,
+            n_games).
+            away_ids (np.array(int)): Away teams ids, of the same shape.
+            state: State of the teams, see initial_state and new_state.
+            rng (np.random.Generator): Random generator used to play the games.
+
+        Returns:
+            tuple(np.array(int), np.array(int), np.array(int)): Home teams scores, away
+            teams scores (None if the model has no scores) and 1 if home team wins else
+            0, of shape (n_iter, n_games) if the ids or the state are by iteration.
+        """
 
     def play(self, team1, team2, return_pts=False):
-        """Simulate a game between two teams, sampling scores from normal distribution.
+        """Simulate a single game between two team objects, like the playoffs series
+        played game by game.
 
         Args:
             team1 (Team): Home team object.
@@ -27,6 +143,150 @@ class GameNaive:
         Returns:
             int: 1 if first team wins else 0.
         """
+        raise NotImplementedError(
+            f"{type(self).__name__} only plays games by batches, see play_batch."
+        )
+
+
+class GameNaive(GameModel):
+    """Game class to play games between teams. Scores for each one are sampled from a
+    normal distribution using their past season scores. The state of the teams is
+    their features arrays, or their rolling scores when they are updated.
+
+    Args:
+        teams_update (bool): Either to update the teams scores after a game or not.
+        hadvg (int, optional): Points added to the home team score. Defaults to None,
+        then HADVG is used.
+        kernel (bool, optional): Play the regular seasons with teams updates game by game
+        with the compiled kernel instead of round by round. Both give the same
+        distributions, but not the same draws for a given seed. The home advantage
+        must then be an integer. If Numba is not installed, a warning is emitted and
+        the seasons are played round by round. Defaults to False.
+    """
+
+    HADVG = 1
+
+    def __init__(self, teams_update=True, hadvg=None, kernel=False):
+        super().__init__(teams_update=teams_update, hadvg=hadvg)
+        if kernel:
+            # The scores of the kernel are integer arrays.
+            if int(self.HADVG) != self.HADVG:
+                raise ValueError("The compiled kernel needs an integer home advantage.")
+            # Imported only when asked for, Numba taking long to import.
+            from .kernels import naive_seasons
+
+            if naive_seasons is None:
+                warnings.warn(
+                    "Numba is not installed, the seasons are played round by round "
+                    "instead of with the compiled kernel."
+                )
+                kernel = False
+        self.kernel = kernel
+
+    def initial_state(self, teams):
+        return teams.features_arrays()
+
+    def new_state(self, teams, n_iter):
+        return TeamsState(teams, n_iter)
+
+    def update_state(self, state, home_ids, away_ids, home_pts, away_pts, home_win):
+        state.update(
+            np.concatenate((home_ids, away_ids)),
+            np.concatenate((home_pts, away_pts), axis=1),
+            np.concatenate((away_pts, home_pts), axis=1),
+        )
+
+    def play_seasons(self, home_ids, away_ids, teams, n_iter, rng):
+        if not self.kernel:
+            return None
+        from .kernels import naive_seasons
+
+        state = TeamsState(teams, 1)
+        return naive_seasons(
+            np.asarray(home_ids, dtype=np.int64),
+            np.asarray(away_ids, dtype=np.int64),
+            state.pts[0],
+            state.opp_pts[0],
+            state.position,
+            state.size,
+            int(self.HADVG),
+            n_iter,
+            int(rng.integers(2**32)),
+        )
+
+    @staticmethod
+    def _normal_params(features, ids, avg, std):
+        """Gather the normal distribution parameters of the teams.
+
+        Args:
+            features (dict): Features arrays of shape (n_teams,) or (n_iter, n_teams).
+            ids (np.array(int)): Teams ids.
+            avg (str): Name of the average feature.
+            std (str): Name of the standard deviation feature.
+
+        Returns:
+            tuple(np.array(float), np.array(float)): Means and standard deviations.
+        """
+        return _gather(features[avg], ids), _gather(features[std], ids)
+
+    def _sample(self, params, rng):
+        """Sample the scores of the games, without handling the ties.
+
+        Args:
+            params (list(tuple(np.array(float), np.array(float)))): Normal distribution
+            parameters of the home team points, of the away team opponents points, of
+            the away team points and of the home team opponents points.
+            rng (np.random.Generator): Random generator used to sample the scores.
+
+        Returns:
+            tuple(np.array(int), np.array(int)): Home teams and away teams scores.
+        """
+        home_pts, away_opp, away_pts, home_opp = params
+        t1 = (rng.normal(*home_pts) + rng.normal(*away_opp)) / 2
+        t2 = (rng.normal(*away_pts) + rng.normal(*home_opp)) / 2
+        t1 = np.rint(t1).astype(np.int64) + self.HADVG
+        t2 = np.rint(t2).astype(np.int64)
+        return t1, t2
+
+    def play_batch(self, home_ids, away_ids, state, rng):
+        """Simulate many games at once. Tied games are played again, only redrawing
+        the scores of the tied ones.
+
+        Args:
+            home_ids (np.array(int)): Home teams ids, of shape (n_games,) or (n_iter,
+            n_games).
+            away_ids (np.array(int)): Away teams ids, of the same shape.
+            state (dict or TeamsState): Features arrays of the teams, see
+            TeamsNaive.features_arrays, or rolling scores of each iteration.
+            rng (np.random.Generator): Random generator used to sample the scores.
+
+        Returns:
+            tuple(np.array(int), np.array(int), np.array(int)): Home teams scores, away
+            teams scores and 1 if home team wins else 0.
+        """
+        features = state
+        if isinstance(state, TeamsState):
+            features = state.features_arrays()
+        home_ids, away_ids = np.asarray(home_ids), np.asarray(away_ids)
+        params = [
+            self._normal_params(features, home_ids, "pts_avg", "pts_std"),
+            self._normal_params(features, away_ids, "opp_avg", "opp_std"),
+            self._normal_params(features, away_ids, "pts_avg", "pts_std"),
+            self._normal_params(features, home_ids, "opp_avg", "opp_std"),
+        ]
+        t1, t2 = self._sample(params, rng)
+        tie = t1 == t2
+        while tie.any():
+            tie_params = [(avg[tie], std[tie]) for avg, std in params]
+            r1, r2 = self._sample(tie_params, rng)
+            t1[tie] = r1
+            t2[tie] = r2
+            tie[tie] = r1 == r2
+        return t1, t2, (t1 > t2).astype(np.int64)
+
+    @staticmethod
+    def _gauss_scores(team1, team2):
+        """Draw the scores of a game from normal distributions of the teams scores."""
         t1 = (
             rnd.gauss(team1.features["pts_avg"], team1.features["pts_std"])
             + rnd.gauss(team2.features["opp_avg"], team2.features["opp_std"])
@@ -35,16 +295,204 @@ class GameNaive:
             rnd.gauss(team2.features["pts_avg"], team2.features["pts_std"])
             + rnd.gauss(team1.features["opp_avg"], team1.features["opp_std"])
         ) / 2
-        t1 = int(round(t1)) + self.HADVG
-        t2 = int(round(t2))
-        if t1 != t2:
-            if self.teams_update:
-                team1.update_last_game(t1, t2)
-                team2.update_last_game(t2, t1)
-            res = 1 if t1 > t2 else 0
-            if return_pts:
-                return res, t1, t2
-            else:
-                return res
+        return t1, t2
+
+    def _play_scores(self, team1, team2, draw_scores, return_pts=False):
+        """Play a game with the scores drawn by draw_scores, tied games being played
+        again, and update the teams with the result if teams_update.
+
+        Args:
+            team1 (Team): Home team object.
+            team2 (Team): Away team object.
+            draw_scores (callable): Called with the two teams, returns their scores
+            before rounding and home advantage.
+            return_pts (bool, optional): To return scores for each team. Defaults to False.
+
+        Returns:
+            int: 1 if first team wins else 0.
+        """
+        t1 = t2 = 0
+        while t1 == t2:
+            t1, t2 = draw_scores(team1, team2)
+            t1 = int(round(t1)) + self.HADVG
+            t2 = int(round(t2))
+        if self.teams_update:
+            team1.update_last_game(t1, t2)
+            team2.update_last_game(t2, t1)
+        res = 1 if t1 > t2 else 0
+        if return_pts:
+            return res, t1, t2
+        return res
+
+    def play(self, team1, team2, return_pts=False):
+        """Simulate a game between two teams, sampling scores from normal distribution.
+
+        Args:
+            team1 (Team): Home team object.
+            team2 (Team): Away team object.
+            return_pts (bool, optional): To return scores for each team. Defaults to False.
+
+        Returns:
+            int: 1 if first team wins else 0.
+        """
+        return self._play_scores(team1, team2, self._gauss_scores, return_pts)
+
+
+class GameBootstrap(GameNaive):
+    """Game class to play games between teams, sampling the scores from the past
+    scores of the teams instead of normal distributions. The score of a team is the
+    mean of one of its past scores and of one of the past conceded points of its
+    opponent, both drawn uniformly, like GameNaive averages two normal draws. The state
+    of the teams is their flat scores pools, or their rolling scores when they are
+    updated.
+
+    Args:
+        teams_update (bool): Either to update the teams scores after a game or not.
+        hadvg (int, optional): Points added to the home team score. Defaults to None,
+        then HADVG is used.
+    """
+
+    def initial_state(self, teams):
+        return teams.score_pools()
+
+    def matchup_table(self, teams):
+        return teams.matchup_table(self.HADVG, bootstrap=True)
+
+    def play_seasons(self, home_ids, away_ids, teams, n_iter, rng):
+        # The compiled kernel samples normal scores.
+        return None
+
+    def play(self, team1, team2, return_pts=False):
+        """Simulate a game between two teams, drawing scores from their past scores.
+
+        Args:
+            team1 (Team): Home team object.
+            team2 (Team): Away team object.
+            return_pts (bool, optional): To return scores for each team. Defaults to False.
+
+        Returns:
+            int: 1 if first team wins else 0.
+        """
+        return self._play_scores(team1, team2, self._choice_scores, return_pts)
+
+    @staticmethod
+    def _choice_scores(team1, team2):
+        """Draw the scores of a game from the past scores of the teams."""
+        t1 = (rnd.choice(team1.pts) + rnd.choice(team2.opp_pts)) / 2
+        t2 = (rnd.choice(team2.pts) + rnd.choice(team1.opp_pts)) / 2
+        return t1, t2
+
+    def _draw(self, state, home_ids, away_ids, iters, rng):
+        """Draw the scores of the games, without handling the ties. All the past
+        scores are drawn with a single call to the random generator and a gather in the
+        scores pools.
+
+        Args:
+            state (dict or TeamsState): Scores pools of the teams, or rolling scores of
+            each iteration.
+            home_ids (np.array(int)): Home teams ids.
+            away_ids (np.array(int)): Away teams ids, of the same shape.
+            iters (np.array(int)): Iteration of each game, of the same shape, if the
+            state is a TeamsState. Else None.
+            rng (np.random.Generator): Random generator used to draw the scores.
+
+        Returns:
+            tuple(np.array(int), np.array(int)): Home teams and away teams scores.
+        """
+        # Teams whose points are drawn, then teams whose conceded points are drawn.
+        teams = np.stack((home_ids, away_ids, away_ids, home_ids))
+        # Uniform indices in the scores of each team, from a single draw with the
+        # pools sizes as upper bounds.
+        if iters is None:
+            draws = rng.integers(0, state["sizes"][teams])
+            draws += state["offsets"][teams]
+            pts = state["pts"][draws[:2]]
+            opp = state["opp_pts"][draws[2:]]
         else:
-            return self.play(team1, team2, return_pts=return_pts)
+            draws = rng.integers(0, state.size[teams])
+            pts = state.pts[iters, teams[:2], draws[:2]]
+            opp = state.opp_pts[iters, teams[2:], draws[2:]]
+        t1 = np.rint((pts[0] + opp[0]) / 2).astype(np.int64) + self.HADVG
+        t2 = np.rint((pts[1] + opp[1]) / 2).astype(np.int64)
+        return t1, t2
+
+    def play_batch(self, home_ids, away_ids, state, rng):
+        """Simulate many games at once. Tied games are played again, only redrawing
+        the scores of the tied ones.
+
+        Args:
+            home_ids (np.array(int)): Home teams ids, of shape (n_games,) or (n_iter,
+            n_games).
+            away_ids (np.array(int)): Away teams ids, of the same shape.
+            state (dict or TeamsState): Scores pools of the teams, see
+            TeamsNaive.score_pools, or rolling scores of each iteration.
+            rng (np.random.Generator): Random generator used to draw the scores.
+
+        Returns:
+            tuple(np.array(int), np.array(int), np.array(int)): Home teams scores, away
+            teams scores and 1 if home team wins else 0.
+        """
+        home_ids, away_ids = np.broadcast_arrays(
+            np.asarray(home_ids), np.asarray(away_ids)
+        )
+        iters = None
+        if isinstance(state, TeamsState):
+            shape = state.pts.shape[:1] + home_ids.shape[-1:]
+            home_ids = np.broadcast_to(home_ids, shape)
+            away_ids = np.broadcast_to(away_ids, shape)
+            iters = np.broadcast_to(np.arange(shape[0])[:, None], shape)
+        t1, t2 = self._draw(state, home_ids, away_ids, iters, rng)
+        tie = t1 == t2
+        while tie.any():
+            r1, r2 = self._draw(
+                state,
+                home_ids[tie],
+                away_ids[tie],
+                None if iters is None else iters[tie],
+                rng,
+            )
+            t1[tie] = r1
+            t2[tie] = r2
+            tie[tie] = r1 == r2
+        return t1, t2, (t1 > t2).astype(np.int64)
+
+
+class GameElo(GameModel):
+    """Game model based on the Elo ratings of the teams. The home team wins with the
+    probability given by elo_pred, its rating being increased by HADVG, so a game only
+    needs one uniform draw. The model has no scores: when the ratings are updated, the
+    margin of victory of a simulated game is its expected margin, which makes the
+    update of elo_update depend on the ratings only. The state of the teams is their
+    ratings.
+
+    Args:
+        teams_update (bool, optional): Either to update the ratings after each game
+        during a regular season, see Season. Defaults to False.
+        hadvg (float, optional): Rating points added to the home team rating. Defaults
+        to None, then HADVG is used.
+    """
+
+    HADVG = HOME_ADVANTAGE
+
+    def initial_state(self, teams):
+        return teams.ratings
+
+    def new_state(self, teams, n_iter):
+        return np.repeat(teams.ratings[None], n_iter, axis=0)
+
+    def update_state(self, state, home_ids, away_ids, home_pts, away_pts, home_win):
+        home = state[:, home_ids] + self.HADVG
+        away = state[:, away_ids]
+        home_wins = home_win == 1
+        winner = np.where(home_wins, home, away)
+        loser = np.where(home_wins, away, home)
+        _, update = elo_update(winner, loser, expected_margin(winner - loser))
+        update = np.where(home_wins, update, -update)
+        state[:, home_ids] += update
+        state[:, away_ids] -= update
+
+    def play_batch(self, home_ids, away_ids, state, rng):
+        home = _gather(state, np.asarray(home_ids)) + self.HADVG
+        away = _gather(state, np.asarray(away_ids))
+        home_win = (rng.random(home.shape) < elo_pred(home, away)).astype(np.int64)
+        return None, None, home_win
@@ -0,0 +1,95 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _naive_seasons(
+    home_ids, away_ids, pts, opp_pts, position, size, hadvg, n_seasons, seed
+):
+    """Play full regular seasons game by game with the naive model, the rolling scores
+    of the teams being updated after each game. Same semantics as GameNaive.play_batch
+    and TeamsState.update, the state being held in flat arrays of one season.
+
+    Compiled, the draws use the generator of Numba. Uncompiled, this function is only
+    meant for the tests: it seeds and draws from the global generator of NumPy.
+
+    Args:
+        home_ids (np.array(int)): Home teams ids of the calendar games.
+        away_ids (np.array(int)): Away teams ids of the calendar games.
+        pts (np.array(int)): Initial rolling points of shape (n_teams, window).
+        opp_pts (np.array(int)): Initial rolling opponents points, same shape.
+        position (np.array(int)): Initial position in the rolling windows by team.
+        size (np.array(int)): Size of the rolling windows by team.
+        hadvg (int): Points added to the home team score, an integer like the scores.
+        n_seasons (int): Number of regular seasons to play.
+        seed (int): Seed of the random generator of the kernel.
+
+    Returns:
+        tuple(np.array(int), np.array(int), np.array(int)): Home teams scores, away
+        teams scores and 1 if home team wins else 0, of shape (n_seasons, n_games).
+    """
+    np.random.seed(seed)
+    n_games = home_ids.shape[0]
+    home_pts = np.zeros((n_seasons, n_games), dtype=np.int64)
+    away_pts = np.zeros((n_seasons, n_games), dtype=np.int64)
+    home_win = np.zeros((n_seasons, n_games), dtype=np.int64)
+    fsize = size.astype(np.float64)
+    for s in range(n_seasons):
+        s_pts = pts.copy()
+        s_opp = opp_pts.copy()
+        s_pos = position.copy()
+        pts_total = s_pts.sum(axis=1)
+        pts_total_sq = (s_pts**2).sum(axis=1)
+        opp_total = s_opp.sum(axis=1)
+        opp_total_sq = (s_opp**2).sum(axis=1)
+        for g in range(n_games):
+            h = home_ids[g]
+            a = away_ids[g]
+            h_avg = pts_total[h] / fsize[h]
+            h_std = np.sqrt(
+                (fsize[h] * pts_total_sq[h] - pts_total[h] ** 2) / fsize[h] ** 2
+            )
+            h_opp_avg = opp_total[h] / fsize[h]
+            h_opp_std = np.sqrt(
+                (fsize[h] * opp_total_sq[h] - opp_total[h] ** 2) / fsize[h] ** 2
+            )
+            a_avg = pts_total[a] / fsize[a]
+            a_std = np.sqrt(
+                (fsize[a] * pts_total_sq[a] - pts_total[a] ** 2) / fsize[a] ** 2
+            )
+            a_opp_avg = opp_total[a] / fsize[a]
+            a_opp_std = np.sqrt(
+                (fsize[a] * opp_total_sq[a] - opp_total[a] ** 2) / fsize[a] ** 2
+            )
+            # Tied games are played again.
+            t1 = t2 = 0
+            while t1 == t2:
+                r1 = np.random.normal(h_avg, h_std)
+                r2 = np.random.normal(a_opp_avg, a_opp_std)
+                r3 = np.random.normal(a_avg, a_std)
+                r4 = np.random.normal(h_opp_avg, h_opp_std)
+                t1 = int(np.rint((r1 + r2) / 2)) + hadvg
+                t2 = int(np.rint((r3 + r4) / 2))
+            home_pts[s, g] = t1
+            away_pts[s, g] = t2
+            home_win[s, g] = 1 if t1 > t2 else 0
+            for k in range(2):
+                team, scored, conceded = (h, t1, t2) if k == 0 else (a, t2, t1)
+                p = s_pos[team]
+                old = s_pts[team, p]
+                old_opp = s_opp[team, p]
+                s_pts[team, p] = scored
+                s_opp[team, p] = conceded
+                pts_total[team] += scored - old
+                pts_total_sq[team] += scored**2 - old**2
+                opp_total[team] += conceded - old_opp
+                opp_total_sq[team] += conceded**2 - old_opp**2
+                s_pos[team] = (p + 1) % size[team]
+    return home_pts, away_pts, home_win
+
+
+# Compiled kernel, None if Numba is not installed.
+naive_seasons = njit(cache=True)(_naive_seasons) if njit is not None else None
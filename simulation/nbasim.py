@@ -1,12 +1,18 @@
-import pandas as pd
+import random as rnd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
-from .teams import TeamsNaive
-from .tournament import Playoffs
+from .teams import TeamsElo, TeamsNaive
+from .tournament import Playoffs, PlayoffsBatch
 from .season import Season
-from .game import GameNaive
-from utls.playoffs import get_playoffs
-from utls.regular_season_calendar import construct_calendar
+from .game import GameBootstrap, GameElo, GameNaive
+from .probabilities import bracket_probabilities
+from utls.standings import Standings
+from utls.counters import SimulationCounters
+from utls.profiler import NullProfiler
+from utls.games_data import load_games_data
+from utls.results import max_half_width
+from utls.regular_season_calendar import construct_calendar, played_games
 
 
 class NBASim:
@@ -19,11 +25,50 @@ class NBASim:
         season_to_play (int): Season to play.
         season_data (int): Season data to use as scores from which to sample
         (should be lower than season_to_play, or equal to if playoffs_only is True).
-        method (str, optional): Sampling method to use (only naive atm.). Defaults to 'naive'.
+        method (str, optional): Sampling method to use, 'naive', 'bootstrap' or 'elo'.
+        With 'bootstrap', the scores are drawn from the teams past scores instead of
+        normal distributions. With 'elo', the games are drawn from the teams Elo
+        ratings computed on season_data games and the regular seasons are always played
+        by blocks. Defaults to 'naive'.
         playoffs_only (bool, optional): Playing only the playoffs and use the real playoffs teams.
         Defaults to False.
+        seed (int, optional): Seed of the random generators. Worker processes get
+        independent generators spawned from it. Defaults to None.
+        block_size (int, optional): If set, the regular seasons are played by blocks of
+        block_size iterations at once as (block_size, n_games) scores matrices, which
+        bounds the memory used, and the playoffs of a block are played at once.
+        Otherwise they are played one by one. When playing only the playoffs, they are
+        played by blocks of block_size (or DEFAULT_PLAYOFFS_BLOCK_SIZE) iterations.
+        Defaults to None.
+        games_data (GamesData, optional): Games data already loaded, to share it between
+        simulations. Defaults to None, then it is loaded from data_path.
+        teams_update (bool, optional): Update the teams scores after each regular season
+        game, each simulated season starting from the season_data scores.
+        Defaults to False.
+        artifact (SeasonArtifact, optional): Season artifact prepared for season_to_play
+        and season_data, used instead of the games data. The regular seasons are then
+        played by blocks (of DEFAULT_BLOCK_SIZE if block_size is not set).
+        Defaults to None.
+        elo_history (pa.Table, optional): Elo history of all the games, see
+        build_elo_history, used to rate the teams with the elo method. Defaults to
+        None, then only the season_data games are replayed.
+        home_advantage (float, optional): Home advantage of the game model, in points
+        for the naive and bootstrap methods and in rating points for the elo method.
+        Defaults to None, then the HADVG of the game model is used.
+        as_of (str, optional): Cutoff of the regular season, a date or a game id, see
+        played_games. The results of the games played at the cutoff are kept and only
+        the other ones are simulated. Defaults to None, then all the games are
+        simulated.
+        kernel (bool, optional): Play the regular seasons with teams updates with the
+        compiled kernel of the naive method, see GameNaive. Set back to False if
+        Numba is not installed. Defaults to False.
+        profiler (PhaseProfiler, optional): Profiler timing the phases of the
+        simulation, see set_profiler. Defaults to None (no profiling).
     """
 
+    DEFAULT_BLOCK_SIZE = 1000
+    DEFAULT_PLAYOFFS_BLOCK_SIZE = 100000
+
     def __init__(
         self,
         data_path,
@@ -31,6 +76,16 @@ class NBASim:
         season_data,
         method="naive",
         playoffs_only=False,
+        seed=None,
+        block_size=None,
+        games_data=None,
+        teams_update=False,
+        artifact=None,
+        elo_history=None,
+        home_advantage=None,
+        as_of=None,
+        kernel=False,
+        profiler=None,
     ):
 
         self.data_path = data_path
@@ -38,41 +93,515 @@ class NBASim:
         self.season_data = season_data
         self.method = method
         self.playoffs_only = playoffs_only
-        df_games = pd.read_parquet(f"{data_path}/BasketRefGames.snappy.parquet")
-        self.teams_info = pd.read_csv(f"{data_path}/teams_info.csv")
-        self.season_calendar = construct_calendar(df_games, self.season_to_play)
-        self.initialize()
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.block_size = block_size
+        self.teams_update = teams_update
+        self.artifact = artifact
+        self.elo_history = elo_history
+        self.home_advantage = home_advantage
+        self.as_of = as_of
+        self.kernel = kernel
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        if method == "elo" and artifact is not None:
+            raise ValueError("The elo method needs the games data, not an artifact.")
+        if as_of is not None and playoffs_only:
+            raise ValueError("as_of is only available when playing the season.")
+        if kernel and method != "naive":
+            raise ValueError("The compiled kernel is only available with naive method.")
+        if method == "elo" and self.block_size is None:
+            self.block_size = self.DEFAULT_BLOCK_SIZE
+        if artifact is not None:
+            self.games_data = artifact
+            self.teams_info = None
+            self.season_calendar = None
+            self.calendar_ylabel = artifact.ylabel
+            if self.block_size is None:
+                self.block_size = self.DEFAULT_BLOCK_SIZE
+        else:
+            with self.profiler.phase("data load"):
+                if games_data is None:
+                    games_data = load_games_data(
+                        data_path, seasons=[self.season_to_play, self.season_data]
+                    )
+                self.games_data = games_data
+                self.teams_info = games_data.teams_info
+                self.season_calendar = construct_calendar(
+                    games_data.season_games(self.season_to_play), self.season_to_play
+                )
+            self.calendar_ylabel = self.season_calendar["ylabel"].values
+        self.played = None
+        if as_of is not None:
+            game_ids = (
+                artifact.game_ids
+                if artifact is not None
+                else self.season_calendar["game_id"].values
+            )
+            self.played = played_games(game_ids, as_of)
+        with self.profiler.phase("setup"):
+            self.initialize()
 
     def initialize(self):
         """Initialize the teams and season according to the method and playoffs_only values."""
-        if self.method == "naive":
+        if self.method in ["naive", "bootstrap"]:
             self.teams = TeamsNaive(
-                self.data_path, self.season_to_play, self.season_data
+                self.data_path,
+                self.season_to_play,
+                self.season_data,
+                games_data=self.games_data,
+            )
+            if self.method == "naive":
+                self.gsim = GameNaive(False, hadvg=self.home_advantage)
+                season_gsim = GameNaive(
+                    self.teams_update, hadvg=self.home_advantage, kernel=self.kernel
+                )
+                self.kernel = season_gsim.kernel
+            else:
+                self.gsim = GameBootstrap(False, hadvg=self.home_advantage)
+                season_gsim = GameBootstrap(
+                    self.teams_update, hadvg=self.home_advantage
+                )
+        elif self.method == "elo":
+            self.teams = TeamsElo(
+                self.data_path,
+                self.season_to_play,
+                self.season_data,
+                games_data=self.games_data,
+                history=self.elo_history,
+            )
+            # Playoffs are played with the initial ratings, like the naive model uses
+            # the initial scores.
+            self.gsim = GameElo(hadvg=self.home_advantage)
+            season_gsim = GameElo(self.teams_update, hadvg=self.home_advantage)
+        else:
+            raise ValueError(f"Unknown method {self.method}.")
+        if self.artifact is not None:
+            self.standings = self.artifact.standings()
+            games_idx = (self.artifact.home_ids, self.artifact.away_ids)
+        else:
+            self.standings = Standings.from_calendar(
+                self.season_calendar, self.teams_info, self.teams.team_ids
+            )
+            games_idx = None
+        season_calendar = self.season_calendar
+        if self.played is not None:
+            # Only the remaining games are simulated, the played ones being counted
+            # once in the standings.
+            if games_idx is None:
+                games_idx = tuple(
+                    self.season_calendar[col].map(self.teams.team_ids).values
+                    for col in ["home_name", "away_name"]
+                )
+                season_calendar = season_calendar[~self.played]
+            games_idx = tuple(x[~self.played] for x in games_idx)
+            self.standings = self.standings.given_results(
+                self.played, self.calendar_ylabel
             )
-            self.gsim = GameNaive(False)
-            if not self.playoffs_only:
-                self.season = Season(self.season_calendar, self.teams_info, self.gsim)
+        self.counters = self.new_counters()
+        if not self.playoffs_only:
+            self.season = Season(
+                season_calendar,
+                self.teams_info,
+                season_gsim,
+                rng=self.rng,
+                games_idx=games_idx,
+                standings=self.standings,
+            )
+        self.set_profiler(self.profiler)
 
-    def play_simulation(self, n_iter=1000):
-        """Run the simulation n_iter times to get probabilities of winning the championship.
+    def set_profiler(self, profiler):
+        """Set the profiler timing the phases of the simulation: data load, setup,
+        regular season games, calendar building, standings, each tie-breaker rule,
+        playoffs and counters.
 
         Args:
-            n_iter (int, optional): Number of times to run the simulation. Defaults to 1000.
-            verbose (bool, optional): Print the results if True, otherwise return it. Defaults to True.
+            profiler (PhaseProfiler or NullProfiler): Profiler to use.
+        """
+        self.profiler = profiler
+        self.standings.profiler = profiler
+        if not self.playoffs_only:
+            self.season.profiler = profiler
+
+    def new_counters(self):
+        """Create empty counters of the playoffs seeds, rounds reached and regular
+        season wins of the teams.
+
+        Returns:
+            SimulationCounters: Empty counters.
+        """
+        return SimulationCounters(
+            self.standings.team_names, int(self.standings.n_games.max())
+        )
+
+    def new_results_store(self, path, chunk_rows=100000):
+        """Create a sink of the per-iteration results of the simulation, see
+        play_simulation.
+
+        Args:
+            path (str): Folder of the parquet files.
+            chunk_rows (int, optional): Number of iterations of a file. Defaults to
+            100000.
+
+        Returns:
+            ResultStore: Empty store.
+        """
+        from utls.result_store import ResultStore
+
+        return ResultStore(
+            path,
+            self.standings.team_names,
+            int(self.standings.n_games.max()),
+            chunk_rows=chunk_rows,
+        )
+
+    def _iter_seasons_teams_ranked(self, n_iter):
+        """Generate the teams ranked at the end of the regular season for each iteration,
+        the regular seasons being played one by one.
+
+        Args:
+            n_iter (int): Number of iterations.
+
+        Yields:
+            tuple(dict, np.array(int)): Dictionnary of k: v with k the conference and v
+            the ranked teams list to play the playoffs, number of wins by team id.
+        """
+        for _ in range(n_iter):
+            self.season.play_regular_season(self.teams)
+            yield self.season.playoffs_teams_ranked, self.season.season_wins
+
+    def _iter_playoffs_seeds(self, n_iter):
+        """Generate the playoffs teams of the iterations by blocks, the regular seasons
+        being played by blocks too.
+
+        Args:
+            n_iter (int): Number of iterations.
+
+        Yields:
+            tuple(np.array(int), np.array(int)): Teams ids of shape (n_seasons, 2, 8),
+            see PlayoffsBatch.seeds_array, number of wins by team id of shape
+            (n_seasons, n_teams).
+        """
+        if self.playoffs_only:
+            season_teams_ranked, wins = self.standings.get_playoffs(
+                self.calendar_ylabel
+            )
+            seeds = PlayoffsBatch.seeds_array(
+                [season_teams_ranked], self.teams.team_ids
+            )
+            block_size = self.block_size or self.DEFAULT_PLAYOFFS_BLOCK_SIZE
+            for start in range(0, n_iter, block_size):
+                n_block = min(block_size, n_iter - start)
+                yield np.repeat(seeds, n_block, axis=0), np.repeat(
+                    wins[None], n_block, axis=0
+                )
+        else:
+            for start in range(0, n_iter, self.block_size):
+                n_seasons = min(self.block_size, n_iter - start)
+                self.season.play_regular_seasons(self.teams, n_seasons)
+                seeds = PlayoffsBatch.seeds_array(
+                    self.season.playoffs_teams_ranked, self.teams.team_ids
+                )
+                yield seeds, self.season.season_wins
+
+    def reseed(self, seed_sequence):
+        """Seed the random generators used by the simulation, including the global ones
+        used to play the playoffs and break the ties.
+
+        Args:
+            seed_sequence (np.random.SeedSequence): Seed sequence to use.
+        """
+        self.rng = np.random.default_rng(seed_sequence)
+        if not self.playoffs_only:
+            self.season.rng = self.rng
+        state = seed_sequence.generate_state(2)
+        rnd.seed(int(state[0]))
+        np.random.seed(int(state[1]))
+
+    def get_random_state(self):
+        """Get the state of the random generators used by the simulation, to be able to
+        resume it later.
+
+        Returns:
+            dict: State of the generators, which can be serialized to JSON.
+        """
+        rnd_state = rnd.getstate()
+        np_state = np.random.get_state()
+        return {
+            "rng": self.rng.bit_generator.state,
+            "seed_sequence": {
+                "entropy": self.seed_sequence.entropy,
+                "spawn_key": list(self.seed_sequence.spawn_key),
+                "n_children_spawned": self.seed_sequence.n_children_spawned,
+            },
+            "random": [rnd_state[0], list(rnd_state[1]), rnd_state[2]],
+            "np_random": [
+                np_state[0],
+                np_state[1].tolist(),
+                *[x.item() if hasattr(x, "item") else x for x in np_state[2:]],
+            ],
+        }
+
+    def set_random_state(self, state):
+        """Restore the state of the random generators used by the simulation.
+
+        Args:
+            state (dict): State of the generators, from get_random_state.
+        """
+        self.rng.bit_generator.state = state["rng"]
+        self.seed_sequence = np.random.SeedSequence(
+            state["seed_sequence"]["entropy"],
+            spawn_key=state["seed_sequence"]["spawn_key"],
+            n_children_spawned=state["seed_sequence"]["n_children_spawned"],
+        )
+        version, internal_state, gauss_next = state["random"]
+        rnd.setstate((version, tuple(internal_state), gauss_next))
+        np_state = state["np_random"]
+        np.random.set_state(
+            (np_state[0], np.array(np_state[1], dtype=np.uint32), *np_state[2:])
+        )
+
+    def _play_iterations(self, n_iter, progress=True, store=None):
+        """Helper function to run the simulation n_iter times in the current process.
+
+        Args:
+            n_iter (int): Number of times to run the simulation.
+            progress (bool, optional): Display a progress bar. Defaults to True.
+            store (ResultStore, optional): Sink of the per-iteration results. Defaults
+            to None.
 
         Returns:
             (dict): Dictionnary with team: number of time it won the championship.
         """
-        final_wins = final_wins = {t: 0 for t in self.teams.dteams.keys()}
-        season_teams_ranked, _ = get_playoffs(self.season_calendar, self.teams_info)
-        for i in tqdm(range(n_iter)):
-            if not self.playoffs_only:
-                self.season.play_regular_season(self.teams)
-                season_teams_ranked = self.season.playoffs_teams_ranked
+        final_wins = {t: 0 for t in self.teams.team_ids}
+        if self.playoffs_only or self.block_size is not None:
+            playoffs_sim = PlayoffsBatch(self.gsim.matchup_table(self.teams), self.rng)
+            with tqdm(total=n_iter, disable=not progress) as pbar:
+                for seeds, wins in self._iter_playoffs_seeds(n_iter):
+                    with self.profiler.phase("playoffs"):
+                        if store is None:
+                            _, rounds = playoffs_sim.play(seeds)
+                        else:
+                            champions, rounds, reached = playoffs_sim.play(
+                                seeds, reached=True
+                            )
+                    with self.profiler.phase("counters"):
+                        self.counters.add(seeds, rounds, wins)
+                        if store is not None:
+                            store.add(champions, seeds, wins, reached)
+                    for t, i in self.teams.team_ids.items():
+                        final_wins[t] += int(rounds[i, -1])
+                    pbar.update(len(seeds))
+            if store is not None:
+                store.flush()
+            return final_wins
 
-            playoffs_sim = Playoffs(season_teams_ranked, self.gsim)
-            winner_playoff = playoffs_sim.get_winner(self.teams)
+        seasons_teams_ranked = self._iter_seasons_teams_ranked(n_iter)
+        for season_teams_ranked, wins in tqdm(
+            seasons_teams_ranked, total=n_iter, disable=not progress
+        ):
+            with self.profiler.phase("playoffs"):
+                playoffs_sim = Playoffs(season_teams_ranked, self.gsim)
+                winner_playoff = playoffs_sim.get_winner(self.teams)
 
             final_wins[winner_playoff] += 1
+            with self.profiler.phase("counters"):
+                seeds = PlayoffsBatch.seeds_array(
+                    [season_teams_ranked], self.teams.team_ids
+                )
+                rounds = self._rounds_counts(playoffs_sim.rounds)
+                self.counters.add(seeds, rounds, wins[None])
+                if store is not None:
+                    store.add(
+                        [self.teams.team_ids[winner_playoff]],
+                        seeds,
+                        wins[None],
+                        rounds.sum(axis=1)[None],
+                    )
 
+        if store is not None:
+            store.flush()
         return final_wins
+
+    def _rounds_counts(self, rounds):
+        """Count the playoffs rounds played by the teams in one iteration.
+
+        Args:
+            rounds (list(list(str))): Teams playing each round, then the winner.
+
+        Returns:
+            np.array(int): Matrix of shape (n_teams, n_rounds + 1) with 1 if the team
+            plays the round (or wins the title).
+        """
+        counts = np.zeros((len(self.teams.team_ids), len(rounds)), dtype=np.int64)
+        for r, teams in enumerate(rounds):
+            counts[[self.teams.team_ids[t] for t in teams], r] = 1
+        return counts
+
+    def playoffs_probabilities(self):
+        """Compute the exact probabilities of winning the championship when playing only
+        the playoffs, from the games, series and bracket probabilities under the game
+        model instead of sampling them.
+
+        Returns:
+            (dict): Dictionnary with team: probability of winning the championship.
+        """
+        if not self.playoffs_only:
+            raise ValueError(
+                "Exact probabilities are only available for playoffs only."
+            )
+        season_teams_ranked, _ = self.standings.get_playoffs(self.calendar_ylabel)
+        matchups = self.gsim.matchup_table(self.teams)
+        rounds = bracket_probabilities(
+            season_teams_ranked, self.teams.team_ids, matchups.series
+        )
+        return {t: rounds[i, -1] for t, i in self.teams.team_ids.items()}
+
+    def play_simulation(self, n_iter=1000, workers=1, progress=True, store=None):
+        """Run the simulation n_iter times to get probabilities of winning the championship.
+        The playoffs seeds, rounds reached and regular season wins of the iterations
+        are added to self.counters, and written iteration by iteration to the store if
+        given.
+
+        Args:
+            n_iter (int, optional): Number of times to run the simulation. Defaults to 1000.
+            workers (int, optional): Number of processes to split the iterations across.
+            Each one is seeded with an independent child of the simulation seed, so the
+            same seed and number of workers give the same results. Defaults to 1.
+            progress (bool, optional): Display a progress bar when there is only one
+            worker. Defaults to True.
+            store (ResultStore, optional): Sink of the per-iteration results, see
+            new_results_store. Each worker writes its own files. Defaults to None.
+
+        Returns:
+            (dict): Dictionnary with team: number of time it won the championship.
+        """
+        if workers == 1:
+            return self._play_iterations(n_iter, progress=progress, store=store)
+
+        seed_sequences = self.seed_sequence.spawn(workers)
+        workers_n_iter = [
+            n_iter // workers + (1 if i < n_iter % workers else 0)
+            for i in range(workers)
+        ]
+        final_wins = {t: 0 for t in self.teams.team_ids}
+        with ProcessPoolExecutor(workers) as executor:
+            results = executor.map(
+                _play_iterations_worker,
+                [self] * workers,
+                workers_n_iter,
+                seed_sequences,
+                [store.spawn() if store is not None else None for _ in range(workers)],
+            )
+            for worker_wins, worker_counters, worker_profiler in results:
+                for t, wins in worker_wins.items():
+                    final_wins[t] += wins
+                self.counters.merge(worker_counters)
+                self.profiler.merge(worker_profiler)
+        return final_wins
+
+    def iter_simulation(
+        self, n_iter, chunk=10000, workers=1, final_wins=None, n_done=0, store=None
+    ):
+        """Run the simulation by chunks of iterations, yielding the cumulative results
+        after each one. The random state can be saved between two chunks with
+        get_random_state to resume the simulation later.
+
+        Args:
+            n_iter (int): Total number of times to run the simulation.
+            chunk (int, optional): Number of iterations of a chunk. Defaults to 10000.
+            workers (int, optional): Number of processes to split each chunk across.
+            Defaults to 1.
+            final_wins (dict, optional): Results of the iterations already done when
+            resuming a simulation. Defaults to None.
+            n_done (int, optional): Number of iterations already done. Defaults to 0.
+            store (ResultStore, optional): Sink of the per-iteration results, written
+            at the end of each chunk. Defaults to None.
+
+        Yields:
+            tuple(int, dict): Number of iterations done, dictionnary with team: number of
+            time it won the championship.
+        """
+        final_wins = dict(final_wins or {t: 0 for t in self.teams.team_ids})
+        while n_done < n_iter:
+            n_chunk = min(chunk, n_iter - n_done)
+            chunk_wins = self.play_simulation(n_chunk, workers=workers, store=store)
+            for t, wins in chunk_wins.items():
+                final_wins[t] += wins
+            n_done += n_chunk
+            yield n_done, dict(final_wins)
+
+    def play_adaptive(
+        self,
+        target_half_width,
+        max_iter,
+        chunk=10000,
+        workers=1,
+        confidence=0.95,
+        final_wins=None,
+        n_done=0,
+        store=None,
+        callback=None,
+    ):
+        """Run the simulation by chunks until the confidence interval of every team
+        probability of winning the championship is narrow enough, or until max_iter
+        iterations are done.
+
+        Args:
+            target_half_width (float): Largest half-width of the Wilson confidence
+            intervals to stop, for example 0.005 for +/-0.5pp. None to run the max_iter
+            iterations.
+            max_iter (int): Maximum number of times to run the simulation.
+            chunk (int, optional): Number of iterations of a chunk. Defaults to 10000.
+            workers (int, optional): Number of processes to split each chunk across.
+            Defaults to 1.
+            confidence (float, optional): Confidence level. Defaults to 0.95.
+            final_wins (dict, optional): Results of the iterations already done when
+            resuming a simulation. Defaults to None.
+            n_done (int, optional): Number of iterations already done. Defaults to 0.
+            store (ResultStore, optional): Sink of the per-iteration results. Defaults
+            to None.
+            callback (callable, optional): Called with the number of iterations done and
+            the results after each chunk, like to save a checkpoint. Defaults to None.
+
+        Returns:
+            tuple(dict, int): Dictionnary with team: number of time it won the
+            championship, number of iterations done.
+        """
+        for n_done, final_wins in self.iter_simulation(
+            max_iter,
+            chunk=chunk,
+            workers=workers,
+            final_wins=final_wins,
+            n_done=n_done,
+            store=store,
+        ):
+            if callback is not None:
+                callback(n_done, final_wins)
+            if (
+                target_half_width is not None
+                and max_half_width(final_wins, n_done, confidence) <= target_half_width
+            ):
+                break
+        return final_wins, n_done
+
+
+def _play_iterations_worker(sim, n_iter, seed_sequence, store=None):
+    """Run n_iter iterations of a simulation in a worker process.
+
+    Args:
+        sim (NBASim): Simulation to run.
+        n_iter (int): Number of times to run the simulation.
+        seed_sequence (np.random.SeedSequence): Seed sequence of the worker.
+        store (ResultStore, optional): Sink of the per-iteration results of the
+        worker. Defaults to None.
+
+    Returns:
+        tuple(dict, SimulationCounters, PhaseProfiler): Dictionnary with team: number
+        of time it won the championship, counters and profiler of the worker
+        iterations.
+    """
+    sim.reseed(seed_sequence)
+    sim.counters = sim.new_counters()
+    sim.set_profiler(sim.profiler.reset())
+    final_wins = sim._play_iterations(n_iter, progress=False, store=store)
+    return final_wins, sim.counters, sim.profiler
@@ -0,0 +1,280 @@
+import numpy as np
+
+# Games of a best-of-7 series where the first team of the duel plays at home, like in
+# Tournament._duel (2-2-1-1-1 format).
+SERIES_HOME_GAMES = [0, 1, 4, 6]
+# Order of the seeds in the conference tournament, like in ConferenceTournament.
+CONFERENCE_GAMES_ORDER = [0, 7, 3, 4, 2, 5, 1, 6]
+
+
+def _rounded_normal_cdf(k, mean, std):
+    """P(round(X) <= k) for X following a normal distribution."""
+    from scipy.special import ndtr
+
+    return ndtr((k + 0.5 - mean) / std)
+
+
+def game_probabilities(features, hadvg):
+    """Compute the probabilities of every home team against every away team under the
+    GameNaive model. Both scores are rounded normal variables, the home one being
+    shifted by hadvg, so the probabilities are sums over the integer scores.
+
+    Args:
+        features (dict): Features arrays of the teams, see TeamsNaive.features_arrays.
+        hadvg (int): Home advantage added to the home team score.
+
+    Returns:
+        tuple(np.array(float), np.array(float)): Matrices of shape (n_teams, n_teams)
+        of the probabilities that the row home team beats the column away team in
+        regulation, and that they are tied (then the game is played again).
+    """
+    f = features
+    home_mean = (f["pts_avg"][:, None] + f["opp_avg"][None, :]) / 2
+    home_std = np.sqrt(f["pts_std"][:, None] ** 2 + f["opp_std"][None, :] ** 2) / 2
+    away_mean = (f["pts_avg"][None, :] + f["opp_avg"][:, None]) / 2
+    away_std = np.sqrt(f["pts_std"][None, :] ** 2 + f["opp_std"][:, None] ** 2) / 2
+    # Scores further than 12 standard deviations from the means have no weight.
+    std = max(home_std.max(), away_std.max())
+    low = np.floor(min(home_mean.min(), away_mean.min()) - 12 * std)
+    high = np.ceil(max(home_mean.max(), away_mean.max()) + 12 * std)
+    k = np.arange(low - abs(hadvg), high + abs(hadvg) + 1)[None, None, :]
+    away_mean, away_std = away_mean[..., None], away_std[..., None]
+    home_mean, home_std = home_mean[..., None], home_std[..., None]
+    away_pmf = _rounded_normal_cdf(k, away_mean, away_std) - _rounded_normal_cdf(
+        k - 1, away_mean, away_std
+    )
+    home_cdf = _rounded_normal_cdf(k - hadvg, home_mean, home_std)
+    home_pmf = home_cdf - _rounded_normal_cdf(k - hadvg - 1, home_mean, home_std)
+    home_win = (away_pmf * (1 - home_cdf)).sum(axis=2)
+    tie = (away_pmf * home_pmf).sum(axis=2)
+    return home_win, tie
+
+
+def home_win_probabilities(features, hadvg):
+    """Compute the probability that the row home team beats the column away team,
+    tied games being played again.
+
+    Args:
+        features (dict): Features arrays of the teams, see TeamsNaive.features_arrays.
+        hadvg (int): Home advantage added to the home team score.
+
+    Returns:
+        np.array(float): Matrix of shape (n_teams, n_teams).
+    """
+    home_win, tie = game_probabilities(features, hadvg)
+    return home_win / (1 - tie)
+
+
+def _pools_histograms(pools, low, n_scores):
+    """Empirical distributions of the points scored and conceded by each team.
+
+    Args:
+        pools (dict): Scores pools of the teams, see TeamsNaive.score_pools.
+        low (int): Lowest score of the histograms.
+        n_scores (int): Number of scores of the histograms.
+
+    Returns:
+        tuple(np.array(float), np.array(float)): Distributions of shape (n_teams,
+        n_scores) of the points scored and of the points conceded.
+    """
+    team = np.repeat(np.arange(len(pools["sizes"])), pools["sizes"])
+    weights = 1 / pools["sizes"][team]
+    hists = []
+    for pts in [pools["pts"], pools["opp_pts"]]:
+        hist = np.zeros((len(pools["sizes"]), n_scores))
+        np.add.at(hist, (team, pts - low), weights)
+        hists.append(hist)
+    return hists
+
+
+def bootstrap_game_probabilities(pools, hadvg):
+    """Compute the probabilities of every home team against every away team under the
+    GameBootstrap model. A team score is the rounded mean of one of its past scores and
+    of one of the past conceded points of its opponent, both drawn uniformly, the home
+    one being shifted by hadvg.
+
+    Args:
+        pools (dict): Scores pools of the teams, see TeamsNaive.score_pools.
+        hadvg (int): Home advantage added to the home team score.
+
+    Returns:
+        tuple(np.array(float), np.array(float)): Matrices of shape (n_teams, n_teams)
+        of the probabilities that the row home team beats the column away team in
+        regulation, and that they are tied (then the game is played again).
+    """
+    low = min(pools["pts"].min(), pools["opp_pts"].min())
+    n_scores = max(pools["pts"].max(), pools["opp_pts"].max()) - low + 1
+    pts, opp = _pools_histograms(pools, low, n_scores)
+    # Distribution of the sum of the row team points and of the column team conceded
+    # points, the sum index s being the value 2 * low + s.
+    sums = np.zeros((len(pts), len(opp), 2 * n_scores - 1))
+    for k in range(n_scores):
+        sums[:, :, k : k + n_scores] += pts[:, k, None, None] * opp[None, :, :]
+    # Sums are halved and rounded like the sampled scores, half to even.
+    scores = np.rint((2 * low + np.arange(2 * n_scores - 1)) / 2).astype(np.int64)
+    # Scores are padded on both sides so that shifting them never wraps around.
+    hadvg = int(hadvg)
+    scores += abs(hadvg) - scores[0]
+    score_pmf = np.zeros(sums.shape[:2] + (scores[-1] + 1 + abs(hadvg),))
+    np.add.at(score_pmf, (slice(None), slice(None), scores), sums)
+    # Home team scores shifted by the home advantage, away team scores.
+    home_pmf = np.roll(score_pmf, hadvg, axis=2)
+    away_pmf = score_pmf.transpose(1, 0, 2)
+    away_cdf = np.cumsum(away_pmf, axis=2)
+    home_win = (home_pmf[:, :, 1:] * away_cdf[:, :, :-1]).sum(axis=2)
+    tie = (home_pmf * away_pmf).sum(axis=2)
+    return home_win, tie
+
+
+def series_win_probabilities(p_home, p_away):
+    """Compute the probability that the first team wins a best-of-7 series, playing at
+    home the games of SERIES_HOME_GAMES.
+
+    Args:
+        p_home (np.array(float)): Probability that the first team wins at home.
+        p_away (np.array(float)): Probability that the first team wins the games it
+        does not play at home.
+
+    Returns:
+        np.array(float): Probability that the first team wins the series.
+    """
+    # Probability of each (first wins, second wins) state of unfinished series.
+    states = {(0, 0): np.ones_like(p_home)}
+    first_wins = np.zeros_like(p_home)
+    for game in range(7):
+        p = p_home if game in SERIES_HOME_GAMES else p_away
+        next_states = {}
+        for (first, second), prob in states.items():
+            if first + 1 == 4:
+                first_wins = first_wins + prob * p
+            else:
+                key = (first + 1, second)
+                next_states[key] = next_states.get(key, 0) + prob * p
+            if second + 1 < 4:
+                key = (first, second + 1)
+                next_states[key] = next_states.get(key, 0) + prob * (1 - p)
+        states = next_states
+    return first_wins
+
+
+def series_matrix(home_win):
+    """Compute the probability that the row team wins a series against the column team,
+    having the home court advantage. Like in Tournament._duel, the game is credited to
+    the first team when the home team wins, also in the games where the second team
+    plays at home.
+
+    Args:
+        home_win (np.array(float)): Home win probabilities matrix.
+
+    Returns:
+        np.array(float): Matrix of shape (n_teams, n_teams).
+    """
+    return series_win_probabilities(home_win, home_win.T)
+
+
+def _duel_distribution(first, second, series):
+    """Distribution of the winner of a duel between two bracket slots.
+
+    Args:
+        first (np.array(float)): Distribution of the team in the first slot, which has
+        the home court advantage.
+        second (np.array(float)): Distribution of the team in the second slot.
+        series (np.array(float)): Series win probabilities matrix.
+
+    Returns:
+        np.array(float): Distribution of the winner.
+    """
+    return first * (series @ second) + second * ((1 - series).T @ first)
+
+
+def bracket_probabilities(season_teams_ranked, team_ids, series):
+    """Compute the exact probability of each team to reach each round of the playoffs
+    bracket played by Playoffs, and to win it.
+
+    Args:
+        season_teams_ranked (dict): Dictionnary of k: v with k the conference and v the
+        ranked teams list to play the playoffs.
+        team_ids (dict): Dictionnary of k: v with k the team name and v its id.
+        series (np.array(float)): Series win probabilities matrix, see series_matrix.
+
+    Returns:
+        np.array(float): Matrix of shape (n_teams, 5) with the probabilities to play the
+        first round, the conference semifinals, the conference finals, the finals and
+        to win the championship.
+    """
+    n_teams = len(team_ids)
+    rounds = np.zeros((n_teams, 5))
+    conference_winners = []
+    for conf in ["ouest", "est"]:
+        slots = []
+        for seed in CONFERENCE_GAMES_ORDER:
+            slot = np.zeros(n_teams)
+            slot[team_ids[season_teams_ranked[conf][seed]]] = 1
+            slots.append(slot)
+        for r in range(3):
+            rounds[:, r] += sum(slots)
+            slots = [
+                _duel_distribution(slots[i], slots[i + 1], series)
+                for i in range(0, len(slots), 2)
+            ]
+        conference_winners.append(slots[0])
+    rounds[:, 3] = sum(conference_winners)
+    rounds[:, 4] = _duel_distribution(*conference_winners, series)
+    return rounds
+
+
+class MatchupTable:
+    """Home win and series win probabilities of every pair of teams, computed once so
+    that a series can be played with a single random draw.
+
+    Args:
+        home_win (np.array(float)): Probability that the row home team beats the column
+        away team, of shape (n_teams, n_teams).
+    """
+
+    def __init__(self, home_win):
+        self.home_win = home_win
+        self.series = series_matrix(self.home_win)
+        # Nested lists are faster than arrays to index one pair at a time.
+        self._series = self.series.tolist()
+
+    @classmethod
+    def from_features(cls, features, hadvg):
+        """Build the table of the naive model from the teams features.
+
+        Args:
+            features (dict): Features arrays of the teams, see
+            TeamsNaive.features_arrays.
+            hadvg (int): Home advantage added to the home team score.
+
+        Returns:
+            MatchupTable: Matchup probabilities.
+        """
+        return cls(home_win_probabilities(features, hadvg))
+
+    @classmethod
+    def from_pools(cls, pools, hadvg):
+        """Build the table of the bootstrap model from the teams scores pools.
+
+        Args:
+            pools (dict): Scores pools of the teams, see TeamsNaive.score_pools.
+            hadvg (int): Home advantage added to the home team score.
+
+        Returns:
+            MatchupTable: Matchup probabilities.
+        """
+        home_win, tie = bootstrap_game_probabilities(pools, hadvg)
+        return cls(home_win / (1 - tie))
+
+    def series_win_probability(self, first_id, second_id):
+        """Probability that the first team wins the series, having the home court
+        advantage.
+
+        Args:
+            first_id (int): Id of the first team.
+            second_id (int): Id of the second team.
+
+        Returns:
+            float: Probability.
+        """
+        return self._series[first_id][second_id]
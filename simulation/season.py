@@ -1,6 +1,6 @@
-import pandas as pd
 import numpy as np
-from utls.playoffs import get_playoffs
+from utls.profiler import NullProfiler
+from utls.standings import Standings
 
 
 class Season:
@@ -9,50 +9,87 @@ class Season:
     Args:
         games_calendar (pd.DataFrame): Games calendar, will be used to simulate the games.
         teams_info (pd.DataFrame): Contains teams information regarding division and conference.
-        game_sim (GameNaive): A game object which will be used to performa a
-        game simulation.
+        game_sim (GameModel): A game model which will be used to play all the games of
+        the calendar at once, see GameModel.play_batch.
+        rng (np.random.Generator, optional): Random generator used to play the games.
+        Defaults to None.
+        games_idx (tuple(np.array(int), np.array(int)), optional): Home and away teams
+        ids of the calendar games. Defaults to None, then they are taken from the
+        games_calendar.
+        standings (Standings, optional): Standings engine of the calendar. Defaults to
+        None, then it is built from the games_calendar.
+        profiler (PhaseProfiler, optional): Profiler timing the games, the calendar
+        building and the standings. Defaults to None (no profiling).
     """
 
-    def __init__(self, games_calendar, teams_info, game_sim):
+    def __init__(
+        self,
+        games_calendar,
+        teams_info,
+        game_sim,
+        rng=None,
+        games_idx=None,
+        standings=None,
+        profiler=None,
+    ):
         self.regular_season_calendar = games_calendar
         self.teams_info = teams_info
         self.gsim = game_sim
+        self.rng = rng if rng is not None else np.random.default_rng()
+        if games_idx is not None:
+            games_idx = tuple(np.asarray(x, dtype=np.int64) for x in games_idx)
+        self.games_idx = games_idx
+        self.standings = standings
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.rounds = None
 
-    def _play_regular_season(self, teams):
-        """Helper function to run the regular season simulation.
+    def _games_idx(self, teams):
+        """Get the home and away teams ids of the calendar games, computed at first use.
 
         Args:
             teams (Teams): Teams object storing the different teams of the season to play.
+
+        Returns:
+            tuple(np.array(int), np.array(int)): Home teams ids, away teams ids.
         """
-        games_calendar = self.regular_season_calendar.copy()
-        cols = [
-            "game_id",
-            "season",
-            "away_id",
-            "home_id",
-            "away_name",
-            "home_name",
-            "away_ftscore",
-            "home_ftscore",
-            "ylabel",
-        ]
-        games_calendar = games_calendar[cols]
-        games_calendar[["home_ftscore", "away_ftscore", "ylabel"]] = np.zeros(
-            (games_calendar.shape[0], 3)
-        )
+        if self.games_idx is None:
+            calendar = self.regular_season_calendar
+            self.games_idx = (
+                calendar["home_name"].map(teams.team_ids).values,
+                calendar["away_name"].map(teams.team_ids).values,
+            )
+        return self.games_idx
+
+    def _get_standings(self, teams):
+        """Get the standings engine of the calendar, built at first use.
 
-        games_to_play = games_calendar[["home_name", "away_name"]].values
-        games_results = []
-        for g in games_to_play:
-            res = self.gsim.play(
-                teams.dteams[g[0]], teams.dteams[g[1]], return_pts=True
+        Args:
+            teams (Teams): Teams object storing the different teams of the season to play.
+
+        Returns:
+            Standings: Standings engine used to rank the teams.
+        """
+        if self.standings is None:
+            self.standings = Standings.from_calendar(
+                self.regular_season_calendar, self.teams_info, teams.team_ids
             )
-            games_results.append(list(res))
+        return self.standings
+
+    def _play_regular_season(self, teams):
+        """Helper function to run the regular season simulation, the home teams
+        scores, away teams scores and ylabel of the games being stored in
+        sim_season_results like play_regular_seasons does.
 
-        games_calendar[["ylabel", "home_ftscore", "away_ftscore"]] = np.array(
-            games_results
+        Args:
+            teams (Teams): Teams object storing the different teams of the season to play.
+        """
+        home_pts, away_pts, ylabel = self._play_regular_seasons(teams, 1)
+        # Scores are None if the game model has none.
+        self.sim_season_results = (
+            home_pts[0] if home_pts is not None else None,
+            away_pts[0] if away_pts is not None else None,
+            ylabel[0],
         )
-        self.sim_season_calendar = games_calendar
 
     def play_regular_season(self, teams):
         """Run the regular season simulation.
@@ -61,6 +98,115 @@ class Season:
             teams (Teams): Teams object storing the different teams of the season to play.
         """
         self._play_regular_season(teams)
-        self.playoffs_teams_ranked, self.season_wins = get_playoffs(
-            self.sim_season_calendar, self.teams_info
-        )
+        with self.profiler.phase("standings"):
+            self.playoffs_teams_ranked, self.season_wins = self._get_standings(
+                teams
+            ).get_playoffs(self.sim_season_results[2])
+
+    def _rounds(self, teams):
+        """Split the calendar in rounds of consecutive games where each team plays at
+        most once, so that the games of a round can be played at once. Computed at first
+        use.
+
+        Args:
+            teams (Teams): Teams object storing the different teams of the season to play.
+
+        Returns:
+            list(slice): Games of each round.
+        """
+        if self.rounds is None:
+            home_idx, away_idx = self._games_idx(teams)
+            self.rounds = []
+            start = 0
+            playing = set()
+            for i, game in enumerate(zip(home_idx.tolist(), away_idx.tolist())):
+                if playing.intersection(game):
+                    self.rounds.append(slice(start, i))
+                    start = i
+                    playing = set()
+                playing.update(game)
+            self.rounds.append(slice(start, len(home_idx)))
+        return self.rounds
+
+    def _play_rounds_updating_teams(self, teams, n_seasons):
+        """Play the calendar round by round, updating the teams scores of each season
+        after each round. All seasons start from the initial teams scores.
+
+        Args:
+            teams (Teams): Teams object storing the different teams of the season to play.
+            n_seasons (int): Number of regular seasons to play.
+
+        Returns:
+            tuple(np.array(int), np.array(int), np.array(int)): ylabel, home teams scores
+            and away teams scores of shape (n_seasons, n_games). Scores are None if
+            the game model has none.
+        """
+        home_idx, away_idx = self._games_idx(teams)
+        state = self.gsim.new_state(teams, n_seasons)
+        ylabel = np.zeros((n_seasons, len(home_idx)), dtype=np.int64)
+        home_pts = away_pts = None
+        for games in self._rounds(teams):
+            home, away = home_idx[games], away_idx[games]
+            h_pts, a_pts, y = self.gsim.play_batch(home, away, state, self.rng)
+            self.gsim.update_state(state, home, away, h_pts, a_pts, y)
+            ylabel[:, games] = y
+            if h_pts is not None:
+                if home_pts is None:
+                    home_pts = np.zeros_like(ylabel)
+                    away_pts = np.zeros_like(ylabel)
+                home_pts[:, games], away_pts[:, games] = h_pts, a_pts
+        return ylabel, home_pts, away_pts
+
+    def _play_regular_seasons(self, teams, n_seasons):
+        """Helper function to run n_seasons regular season simulations at once, without
+        building any DataFrame. If the game model updates the teams, the games are
+        played game by game with its compiled kernel if it uses one, else round by
+        round.
+
+        Args:
+            teams (Teams): Teams object storing the different teams of the season to play.
+            n_seasons (int): Number of regular seasons to play.
+
+        Returns:
+            tuple(np.array(int), np.array(int), np.array(int)): Home teams scores,
+            away teams scores and ylabel (1 if home team wins) of shape (n_seasons,
+            n_games).
+        """
+        home_idx, away_idx = self._games_idx(teams)
+        with self.profiler.phase("season games"):
+            if self.gsim.teams_update:
+                results = self.gsim.play_seasons(
+                    home_idx, away_idx, teams, n_seasons, self.rng
+                )
+                if results is not None:
+                    home_pts, away_pts, ylabel = results
+                else:
+                    ylabel, home_pts, away_pts = self._play_rounds_updating_teams(
+                        teams, n_seasons
+                    )
+            else:
+                size = (n_seasons, len(home_idx))
+                home_pts, away_pts, ylabel = self.gsim.play_batch(
+                    np.broadcast_to(home_idx, size),
+                    np.broadcast_to(away_idx, size),
+                    self.gsim.initial_state(teams),
+                    self.rng,
+                )
+        return home_pts, away_pts, ylabel
+
+    def play_regular_seasons(self, teams, n_seasons):
+        """Run n_seasons regular season simulations at once and rank the teams of each
+        one.
+
+        Args:
+            teams (Teams): Teams object storing the different teams of the season to play.
+            n_seasons (int): Number of regular seasons to play.
+        """
+        home_pts, away_pts, ylabel = self._play_regular_seasons(teams, n_seasons)
+        self.sim_seasons_results = (home_pts, away_pts, ylabel)
+        # Wins include the ones of the games already played, if any.
+        standings = self._get_standings(teams)
+        with self.profiler.phase("standings"):
+            self.playoffs_teams_ranked, self.season_wins = standings.get_playoffs_many(
+                ylabel
+            )
@@ -0,0 +1,174 @@
+import itertools
+import json
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from utls.games_data import load_games_data
+from .nbasim import NBASim
+
+# Grid keys, each one being a value or a list of values, and their defaults.
+GRID_KEYS = {
+    "seasons": [[2018, 2017]],
+    "method": ["naive"],
+    "home_advantage": [None],
+    "n_iter": [1000],
+}
+# Keys shared by all the scenarios.
+COMMON_KEYS = {
+    "playoffs_only": False,
+    "block_size": 1000,
+    "teams_update": False,
+    "seed": 42,
+}
+
+# Games data of the sweep, loaded once by the parent process and inherited by the
+# workers, see _init_worker.
+_GAMES_DATA = None
+
+
+def load_sweep_spec(path):
+    """Load a sweep specification from a JSON file, or a YAML one if PyYAML is
+    installed.
+
+    Args:
+        path (str): Path to the specification, the format being given by the extension.
+
+    Returns:
+        dict: Specification.
+    """
+    text = Path(path).read_text()
+    if Path(path).suffix in [".yaml", ".yml"]:
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is needed to read a YAML sweep specification.")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def sweep_scenarios(spec):
+    """Expand a sweep specification to the list of its scenarios, the cartesian product
+    of the grid values.
+
+    Args:
+        spec (dict): Specification with the GRID_KEYS, each one being a value or a list
+        of values, and the COMMON_KEYS. Missing keys take their default value.
+        Seasons are [season_to_play, season_data] pairs.
+
+    Returns:
+        list(dict): Parameters of each scenario.
+    """
+    unknown = set(spec) - set(GRID_KEYS) - set(COMMON_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown sweep keys {sorted(unknown)}.")
+    common = {k: spec.get(k, v) for k, v in COMMON_KEYS.items()}
+    grid = {}
+    for k, default in GRID_KEYS.items():
+        values = spec.get(k, default)
+        # A single seasons pair is a list of two ints.
+        if not isinstance(values, list) or (
+            k == "seasons" and values and not isinstance(values[0], list)
+        ):
+            values = [values]
+        grid[k] = values
+    scenarios = []
+    for values in itertools.product(*grid.values()):
+        scenario = dict(zip(grid, values))
+        season_to_play, season_data = scenario.pop("seasons")
+        if season_data > season_to_play or (
+            season_data == season_to_play and not common["playoffs_only"]
+        ):
+            raise ValueError(
+                f"Season data {season_data} can not be used to play {season_to_play}"
+                f" with playoffs_only {common['playoffs_only']}."
+            )
+        scenarios.append(
+            {"season_to_play": season_to_play, "season_data": season_data, **scenario}
+        )
+    return scenarios
+
+
+def _init_worker(games_data):
+    global _GAMES_DATA
+    _GAMES_DATA = games_data
+
+
+def _run_scenario(data_path, scenario, common, seed):
+    """Run the simulations of a scenario on the games data of the sweep.
+
+    Args:
+        data_path (str): Path to the data folder.
+        scenario (dict): Parameters of the scenario, see sweep_scenarios.
+        common (dict): Parameters shared by all the scenarios.
+        seed (int): Seed of the scenario.
+
+    Returns:
+        list(dict): Results of the teams, one row by team.
+    """
+    sim = NBASim(
+        data_path,
+        scenario["season_to_play"],
+        scenario["season_data"],
+        method=scenario["method"],
+        playoffs_only=common["playoffs_only"],
+        seed=seed,
+        block_size=common["block_size"],
+        games_data=_GAMES_DATA,
+        teams_update=common["teams_update"],
+        home_advantage=scenario["home_advantage"],
+    )
+    # Also seed the global generators used to break the standings ties.
+    sim.reseed(np.random.SeedSequence(seed))
+    final_wins = sim.play_simulation(scenario["n_iter"], progress=False)
+    return [
+        {
+            **scenario,
+            "home_advantage": float(sim.gsim.HADVG),
+            "playoffs_only": common["playoffs_only"],
+            "teams_update": common["teams_update"],
+            "team": team,
+            "wins": wins,
+            "probability": wins / scenario["n_iter"],
+        }
+        for team, wins in final_wins.items()
+    ]
+
+
+def run_sweep(data_path, spec, workers=1):
+    """Run all the scenarios of a sweep. The games data of all the seasons is loaded
+    once and shared by the scenarios, which are run in parallel by a pool of processes.
+    Each scenario is seeded with its own child of the sweep seed, so the results do not
+    depend on the number of workers.
+
+    Args:
+        data_path (str): Path to the data folder.
+        spec (dict): Sweep specification, see sweep_scenarios.
+        workers (int, optional): Number of processes to run the scenarios. Defaults to
+        1.
+
+    Returns:
+        pd.DataFrame: Tidy results, one row by scenario and team, with the scenario
+        parameters, the number of championships won by the team and its probability.
+    """
+    scenarios = sweep_scenarios(spec)
+    common = {k: spec.get(k, v) for k, v in COMMON_KEYS.items()}
+    seasons = {s[k] for s in scenarios for k in ["season_to_play", "season_data"]}
+    games_data = load_games_data(data_path, seasons=seasons)
+    seeds = [
+        int(s.generate_state(1)[0])
+        for s in np.random.SeedSequence(common["seed"]).spawn(len(scenarios))
+    ]
+    args = [[str(data_path)] * len(scenarios), scenarios, [common] * len(scenarios)]
+    if workers == 1:
+        _init_worker(games_data)
+        results = list(map(_run_scenario, *args, seeds))
+    else:
+        with ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(games_data,)
+        ) as executor:
+            results = list(executor.map(_run_scenario, *args, seeds))
+    rows = [
+        {"scenario": i, **row} for i, result in enumerate(results) for row in result
+    ]
+    return pd.DataFrame(rows)
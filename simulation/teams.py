@@ -1,9 +1,57 @@
-import pandas as pd
+import math
 import numpy as np
+from utls.games_data import load_games_data
+from .elo_calc import HOME_ADVANTAGE, INITIAL_ELO, elo_pred, elo_update
+from .elo_calc import season_final_ratings, season_regression
+from .probabilities import MatchupTable
 
+FEATURES = ["pts_avg", "pts_std", "opp_avg", "opp_std"]
 
-def add_pts(pts, new):
-    return np.concatenate((pts[1:], [new]))
+
+class RollingScores:
+    """Fixed size window of scores stored in a ring buffer. Running sums of the scores
+    and of their squares give the mean and standard deviation of the window in O(1)
+    after each new score. Scores being integers, the sums are exact.
+
+    Args:
+        scores (list(int)): Initial scores of the window, oldest first.
+    """
+
+    def __init__(self, scores):
+        self.buffer = [int(x) for x in scores]
+        self.size = len(self.buffer)
+        self.position = 0
+        self.total = sum(self.buffer)
+        self.total_sq = sum(x * x for x in self.buffer)
+
+    def add(self, score):
+        """Add a new score to the window, replacing the oldest one.
+
+        Args:
+            score (int): New score.
+        """
+        score = int(score)
+        old = self.buffer[self.position]
+        self.buffer[self.position] = score
+        self.position = (self.position + 1) % self.size
+        self.total += score - old
+        self.total_sq += score * score - old * old
+
+    def mean(self):
+        return self.total / self.size
+
+    def std(self):
+        return math.sqrt(
+            (self.size * self.total_sq - self.total * self.total) / self.size**2
+        )
+
+    def values(self):
+        """Get the scores of the window, oldest first.
+
+        Returns:
+            np.array(int): Scores.
+        """
+        return np.array(self.buffer[self.position :] + self.buffer[: self.position])
 
 
 class TeamNaive:
@@ -18,18 +66,30 @@ class TeamNaive:
     def __init__(self, name, pts, opp_pts):
 
         self.name = name
-        self.pts = pts
-        self.opp_pts = opp_pts
+        self.rolling_pts = RollingScores(pts)
+        self.rolling_opp_pts = RollingScores(opp_pts)
+        # Incremented each time the features are computed, to invalidate the values
+        # derived from them.
+        self.features_version = 0
         self.get_features()
 
+    @property
+    def pts(self):
+        return self.rolling_pts.values()
+
+    @property
+    def opp_pts(self):
+        return self.rolling_opp_pts.values()
+
     def get_features(self):
         """Compute the features of the team from its scores."""
         self.features = {
-            "pts_avg": np.mean(self.pts),
-            "pts_std": np.std(self.pts),
-            "opp_avg": np.mean(self.opp_pts),
-            "opp_std": np.std(self.opp_pts),
+            "pts_avg": self.rolling_pts.mean(),
+            "pts_std": self.rolling_pts.std(),
+            "opp_avg": self.rolling_opp_pts.mean(),
+            "opp_std": self.rolling_opp_pts.std(),
         }
+        self.features_version += 1
 
     def update_last_game(self, pts, opp_pts):
         """Update the teams scores with the ones from the last game.
@@ -38,11 +98,76 @@ class TeamNaive:
             pts (int): Points scored.
             opp_pts (int): Points scored by the opponent.
         """
-        self.pts = add_pts(self.pts, pts)
-        self.opp_pts = add_pts(self.opp_pts, opp_pts)
+        self.rolling_pts.add(pts)
+        self.rolling_opp_pts.add(opp_pts)
         self.get_features()
 
 
+class TeamsState:
+    """Rolling scores of all the teams for many iterations at once, updated between
+    game days. Like RollingScores, each team window is a ring buffer with running sums,
+    the buffers being stored in arrays of shape (n_iter, n_teams, window).
+
+    Args:
+        teams (TeamsNaive): Teams object from which the initial scores are taken.
+        n_iter (int): Number of iterations.
+    """
+
+    def __init__(self, teams, n_iter):
+        rolling = [teams.dteams[t].rolling_pts for t in teams.teams_names]
+        rolling_opp = [teams.dteams[t].rolling_opp_pts for t in teams.teams_names]
+        self.size = np.array([r.size for r in rolling])
+        window = self.size.max()
+        self.position = np.zeros(len(rolling), dtype=np.int64)
+        self.pts = np.zeros((n_iter, len(rolling), window), dtype=np.int64)
+        self.opp_pts = np.zeros((n_iter, len(rolling), window), dtype=np.int64)
+        for i, (r, r_opp) in enumerate(zip(rolling, rolling_opp)):
+            self.pts[:, i, : r.size] = r.values()
+            self.opp_pts[:, i, : r.size] = r_opp.values()
+        self.pts_total = self.pts.sum(axis=2)
+        self.pts_total_sq = (self.pts**2).sum(axis=2)
+        self.opp_total = self.opp_pts.sum(axis=2)
+        self.opp_total_sq = (self.opp_pts**2).sum(axis=2)
+
+    def update(self, team_ids, pts, opp_pts):
+        """Update the teams scores with the ones of their last game.
+
+        Args:
+            team_ids (np.array(int)): Teams ids, a team can appear only once.
+            pts (np.array(int)): Points scored, of shape (n_iter, len(team_ids)).
+            opp_pts (np.array(int)): Points scored by the opponents, same shape.
+        """
+        position = self.position[team_ids]
+        old = self.pts[:, team_ids, position]
+        old_opp = self.opp_pts[:, team_ids, position]
+        self.pts[:, team_ids, position] = pts
+        self.opp_pts[:, team_ids, position] = opp_pts
+        self.pts_total[:, team_ids] += pts - old
+        self.pts_total_sq[:, team_ids] += pts**2 - old**2
+        self.opp_total[:, team_ids] += opp_pts - old_opp
+        self.opp_total_sq[:, team_ids] += opp_pts**2 - old_opp**2
+        self.position[team_ids] = (position + 1) % self.size[team_ids]
+
+    def features_arrays(self):
+        """Compute the features of the teams from their scores.
+
+        Returns:
+            dict: Dictionnary of k: v with k the feature name and v the array of the
+            teams values of shape (n_iter, n_teams).
+        """
+        size = self.size.astype(float)
+        return {
+            "pts_avg": self.pts_total / size,
+            "pts_std": np.sqrt(
+                (size * self.pts_total_sq - self.pts_total**2) / size**2
+            ),
+            "opp_avg": self.opp_total / size,
+            "opp_std": np.sqrt(
+                (size * self.opp_total_sq - self.opp_total**2) / size**2
+            ),
+        }
+
+
 class TeamsNaive:
     """Object to store all the teams who will play a season or playoffs.
 
@@ -51,20 +176,40 @@ class TeamsNaive:
         season_to_play (int): Season to play.
         season_data (int): Season data to use as past scores.
         playoffs_only (bool, optional): If they play only the playoffs. Defaults to False.
+        games_data (GamesData, optional): Games data already loaded, or a SeasonArtifact
+        of the two seasons. Defaults to None, then it is loaded from data_path.
     """
 
-    def __init__(self, data_path, season_to_play, season_data, playoffs_only=False):
+    def __init__(
+        self,
+        data_path,
+        season_to_play,
+        season_data,
+        playoffs_only=False,
+        games_data=None,
+    ):
         self.data_path = data_path
         self.season_to_play = season_to_play
         self.season_data = season_data
         self.playoffs_only = playoffs_only
-        self.games_results = pd.read_parquet(
-            f"{self.data_path}/BasketRefGames.snappy.parquet"
-        )
-        self.teams_info = pd.read_csv(f"{self.data_path}/teams_info.csv")
+        if games_data is None:
+            games_data = load_games_data(
+                self.data_path, seasons=[self.season_to_play, self.season_data]
+            )
+        self.games_data = games_data
         self.teams_names = self._get_teams_from_season(self.season_to_play)
         self.teams_names_previous = self._get_teams_from_season(self.season_data)
+        self.team_ids = {t: i for i, t in enumerate(self.teams_names)}
         self.construct_teams()
+        self._matchup_table = None
+        self._matchup_key = None
+        self._pools = None
+        self._pools_key = None
+
+    @property
+    def teams_info(self):
+        """Teams info for conference and division."""
+        return self.games_data.teams_info
 
     def _get_teams_from_season(self, season):
         """Extract teams name from a specific season.
@@ -75,9 +220,7 @@ class TeamsNaive:
         Returns:
             np.array(str): Teams name.
         """
-        return self.games_results.loc[
-            self.games_results["season"] == season, "away_name"
-        ].unique()
+        return self.games_data.teams_from_season(season)
 
     def check_in_both_seasons(self, verbose=False):
         check_teams_in_both = all(
@@ -100,26 +243,7 @@ class TeamsNaive:
         Returns:
             tuple(int, int): Points scored by the team, points scored by its opponents
         """
-        if self.playoffs_only and (self.season_to_play == self.season_data):
-            games_results = self.games_results.loc[
-                self.games_results["season"] == self.season_to_play
-            ]
-            if self.season_to_play != 2011:
-                games_results = games_results.iloc[:1230]
-            else:
-                games_results = games_results.iloc[:990]
-        season_filter = self.games_results["season"] == season
-        team_away_filter = self.games_results["away_name"] == team
-        team_home_filter = self.games_results["home_name"] == team
-        df_away = self.games_results.loc[season_filter & team_away_filter, :]
-        df_home = self.games_results.loc[season_filter & team_home_filter, :]
-        away_pts = df_away["away_ftscore"].values
-        home_pts = df_home["home_ftscore"].values
-        away_ptsr = df_away["home_ftscore"].values
-        home_ptsr = df_home["away_ftscore"].values
-        return np.concatenate((away_pts, home_pts)), np.concatenate(
-            (away_ptsr, home_ptsr)
-        )
+        return self.games_data.season_scores[(season, team)]
 
     def _teams_data(self, season):
         """From a df of all games, extract for each team its pts scored and pts against them"""
@@ -135,3 +259,165 @@ class TeamsNaive:
         self.dteams = {
             t: TeamNaive(t, *past_season_scores[t]) for t in self.teams_names
         }
+
+    def features_arrays(self):
+        """Stack the features of the teams in arrays indexed by team id.
+
+        Returns:
+            dict: Dictionnary of k: v with k the feature name and v the array of the
+            teams values, in the same order as self.teams_names.
+        """
+        return {
+            k: np.array([self.dteams[t].features[k] for t in self.teams_names])
+            for k in FEATURES
+        }
+
+    def _versions(self):
+        return [self.dteams[t].features_version for t in self.teams_names]
+
+    def score_pools(self):
+        """Concatenate the scores of the teams in flat pools, the scores of a team being
+        contiguous, so that scores of many teams can be drawn with a single gather. The
+        pools are computed once and computed again only if the scores of a team have
+        changed since.
+
+        Returns:
+            dict: Points scored (pts) and conceded (opp_pts) by the teams, indexed by
+            the offsets of shape (n_teams + 1,) of the teams first scores, and the
+            number of scores of each team (sizes).
+        """
+        key = self._versions()
+        if key != self._pools_key:
+            teams = [self.dteams[t] for t in self.teams_names]
+            sizes = np.array([team.rolling_pts.size for team in teams])
+            self._pools = {
+                "pts": np.concatenate([team.pts for team in teams]),
+                "opp_pts": np.concatenate([team.opp_pts for team in teams]),
+                "offsets": np.concatenate(([0], np.cumsum(sizes))),
+                "sizes": sizes,
+            }
+            self._pools_key = key
+        return self._pools
+
+    def matchup_table(self, hadvg, bootstrap=False):
+        """Get the matchup probabilities of the teams. The table is computed once and
+        computed again only if the features of a team have changed since.
+
+        Args:
+            hadvg (int): Home advantage added to the home team score.
+            bootstrap (bool, optional): Compute the probabilities of the bootstrap model
+            from the scores pools instead of the ones of the naive model. Defaults to
+            False.
+
+        Returns:
+            MatchupTable: Matchup probabilities, indexed by team id.
+        """
+        key = (hadvg, bootstrap, self._versions())
+        if key != self._matchup_key:
+            if bootstrap:
+                self._matchup_table = MatchupTable.from_pools(self.score_pools(), hadvg)
+            else:
+                self._matchup_table = MatchupTable.from_features(
+                    self.features_arrays(), hadvg
+                )
+            self._matchup_key = key
+        return self._matchup_table
+
+
+class TeamsElo:
+    """Object to store the Elo ratings of the teams who will play a season or playoffs.
+    Ratings are the ones at the end of season_data, computed by replaying its games
+    from the initial rating or taken from an Elo history of all the games. They are
+    then regressed toward the initial rating if season_data is a previous season.
+
+    Args:
+        data_path (str): Path to the data folder.
+        season_to_play (int): Season to play.
+        season_data (int): Season whose games are used to compute the ratings.
+        games_data (GamesData, optional): Games data already loaded. Defaults to None,
+        then it is loaded from data_path.
+        history (pa.Table, optional): Elo history, see build_elo_history. Defaults to
+        None, then only the season_data games are replayed.
+    """
+
+    def __init__(
+        self, data_path, season_to_play, season_data, games_data=None, history=None
+    ):
+        self.data_path = data_path
+        self.season_to_play = season_to_play
+        self.season_data = season_data
+        self.history = history
+        if games_data is None:
+            games_data = load_games_data(
+                self.data_path, seasons=[self.season_to_play, self.season_data]
+            )
+        self.games_data = games_data
+        self.teams_names = games_data.teams_from_season(self.season_to_play)
+        self.team_ids = {t: i for i, t in enumerate(self.teams_names)}
+        self.ratings = self._season_ratings()
+        self._matchup_table = None
+        self._matchup_key = None
+
+    @property
+    def teams_info(self):
+        """Teams info for conference and division."""
+        return self.games_data.teams_info
+
+    def _season_ratings(self):
+        """Replay the season_data games in chronological order to rate the teams.
+
+        Returns:
+            np.array(float): Ratings of the teams, indexed by team id.
+        """
+        games = self.games_data.games
+        if self.history is not None:
+            games = games[games["season"] == self.season_to_play]
+            franchise_ids = dict(zip(games["home_name"], games["home_id"]))
+            final = season_final_ratings(self.history, self.season_data)
+            ratings = np.array(
+                [final.get(franchise_ids[t], INITIAL_ELO) for t in self.teams_names]
+            )
+            if self.season_data != self.season_to_play:
+                ratings = season_regression(ratings)
+            return ratings
+        games = games[games["season"] == self.season_data].sort_values("game_id")
+        elo = {}
+        for home, away, home_pts, away_pts in zip(
+            games["home_name"].values,
+            games["away_name"].values,
+            games["home_ftscore"].values,
+            games["away_ftscore"].values,
+        ):
+            home_elo = elo.get(home, INITIAL_ELO)
+            away_elo = elo.get(away, INITIAL_ELO)
+            if home_pts > away_pts:
+                _, update = elo_update(
+                    home_elo + HOME_ADVANTAGE, away_elo, home_pts - away_pts
+                )
+            else:
+                _, update = elo_update(
+                    away_elo, home_elo + HOME_ADVANTAGE, away_pts - home_pts
+                )
+                update = -update
+            elo[home] = home_elo + update
+            elo[away] = away_elo - update
+        ratings = np.array([elo.get(t, INITIAL_ELO) for t in self.teams_names])
+        if self.season_data != self.season_to_play:
+            ratings = season_regression(ratings)
+        return ratings
+
+    def matchup_table(self, hadvg):
+        """Get the matchup probabilities of the teams from their ratings, computed at
+        first use.
+
+        Args:
+            hadvg (float): Home advantage added to the home team rating.
+
+        Returns:
+            MatchupTable: Matchup probabilities, indexed by team id.
+        """
+        if hadvg != self._matchup_key:
+            home_win = elo_pred(self.ratings[:, None] + hadvg, self.ratings[None, :])
+            self._matchup_table = MatchupTable(home_win)
+            self._matchup_key = hadvg
+        return self._matchup_table
@@ -1,4 +1,6 @@
+import random as rnd
 import numpy as np
+from .game import GameElo
 
 
 class Tournament:
@@ -18,25 +20,41 @@ class Tournament:
                         W2 /
                     2 /
         game_sim (GameNaive): Game to make the teams play against each other.
+        game_by_game (bool, optional): Play the series game by game even when the
+        games do not update the teams, instead of a single random draw from the
+        matchup probabilities. Defaults to False.
     """
 
-    def __init__(self, games_order, game_sim):
+    def __init__(self, games_order, game_sim, game_by_game=False):
+        if isinstance(game_sim, GameElo) and (game_by_game or game_sim.teams_update):
+            raise ValueError(
+                "The Elo model has no team objects to play series game by game."
+            )
         self.games_order = games_order
         self.gsim = game_sim
+        self.game_by_game = game_by_game
 
-    def _duel(self, i, teams):
+    def _duel(self, i, teams, matchups=None):
         """Play a duel between two teams.
 
         Args:
             i (int): Index of the first name of the game to play, indices being
             processed two by two.
             teams (TeamsNaive): Object containing the teams.
+            matchups (MatchupTable, optional): Matchup probabilities of the teams. If
+            set, the series is played with a single random draw instead of game by game.
+            Defaults to None.
 
         Returns:
             int: The loser of the game to be removed from the tournament.
         """
         first_name = self.games_order[i]
         second_name = self.games_order[i + 1]
+        if matchups is not None:
+            p = matchups.series_win_probability(
+                teams.team_ids[first_name], teams.team_ids[second_name]
+            )
+            return i + 1 if rnd.random() < p else i
         first = second = 0
         while (first < 4) and (second < 4):
             if first + second in [0, 1, 4, 6]:
@@ -65,14 +83,22 @@ class Tournament:
         Returns:
             str: Name of the winner.
         """
+        # Teams playing each round, the last one being the winner.
+        self.rounds = []
+        # Teams features only change during the tournament if the games update them.
+        matchups = None
+        if not self.gsim.teams_update and not self.game_by_game:
+            matchups = self.gsim.matchup_table(teams)
         while len(self.games_order) > 1:
+            self.rounds.append(list(self.games_order))
             loser = []
             for i in range(0, len(self.games_order), 2):
                 loses_duel = 0
-                loses_duel = self._duel(i, teams)
+                loses_duel = self._duel(i, teams, matchups)
                 loser.append(loses_duel)
             for i in loser[::-1]:
                 self.games_order.pop(i)
+        self.rounds.append(list(self.games_order))
         return self.games_order[0]
 
 
@@ -83,13 +109,14 @@ class ConferenceTournament:
         lplayers (list(str)): List of the teams ranked by the end of the regular
         season. First one being the top one in conference.
         game_sim (GameNaive): Game to make the teams play against each other.
+        game_by_game (bool, optional): Play the series game by game. Defaults to False.
     """
 
-    def __init__(self, lplayers, game_sim):
+    def __init__(self, lplayers, game_sim, game_by_game=False):
         self.start_games_order = [0, 7, 3, 4, 2, 5, 1, 6]
         # Reorder the team names according to playoffs games order.
         self.lplayers = [lplayers[x] for x in self.start_games_order]
-        self.tournament = Tournament(self.lplayers, game_sim)
+        self.tournament = Tournament(self.lplayers, game_sim, game_by_game)
 
     def get_winner(self, teams):
         """Play the conference tournament with the teams.
@@ -110,12 +137,13 @@ class FinalTournament:
         lplayers (list(str)): List of the teams 'ranked' by the end of the first three
         rounds. First one being the winner of the west conference playoffs.
         game_sim (GameNaive): Game to make the teams play against each other.
+        game_by_game (bool, optional): Play the series game by game. Defaults to False.
     """
 
-    def __init__(self, lplayers, game_sim):
+    def __init__(self, lplayers, game_sim, game_by_game=False):
         self.start_games_order = [0, 1]
         self.lplayers = [lplayers[x] for x in self.start_games_order]
-        self.tournament = Tournament(self.lplayers, game_sim)
+        self.tournament = Tournament(self.lplayers, game_sim, game_by_game)
 
     def get_winner(self, teams):
         """Play the conference tournament with the teams.
@@ -137,11 +165,13 @@ class Playoffs:
         ranked teams list to play the playoffs. First one of a list being the top one
         of the conference playoffs.
         game_sim (GameNaive): Game to make the teams play against each other.
+        game_by_game (bool, optional): Play the series game by game. Defaults to False.
     """
 
-    def __init__(self, season_teams_ranked, game_sim):
+    def __init__(self, season_teams_ranked, game_sim, game_by_game=False):
         self.season_teams_ranked = season_teams_ranked
         self.gsim = game_sim
+        self.game_by_game = game_by_game
 
     def get_winner(self, teams):
         """Play the playoffs tournament with the teams.
@@ -154,13 +184,98 @@ class Playoffs:
         """
         # Play each conf playoffs
         playoff_ouest = ConferenceTournament(
-            self.season_teams_ranked["ouest"], self.gsim
+            self.season_teams_ranked["ouest"], self.gsim, self.game_by_game
         )
         winner_ouest = playoff_ouest.get_winner(teams)
-        playoff_est = ConferenceTournament(self.season_teams_ranked["est"], self.gsim)
+        playoff_est = ConferenceTournament(
+            self.season_teams_ranked["est"], self.gsim, self.game_by_game
+        )
         winner_est = playoff_est.get_winner(teams)
         # Play final
         final_players = [winner_ouest, winner_est]
-        season_final = FinalTournament(final_players, self.gsim)
+        season_final = FinalTournament(final_players, self.gsim, self.game_by_game)
         winner_playoff = season_final.get_winner(teams)
+        # Teams playing each round, then the winner.
+        self.rounds = [
+            west + east
+            for west, east in zip(
+                playoff_ouest.tournament.rounds[:-1], playoff_est.tournament.rounds[:-1]
+            )
+        ] + season_final.tournament.rounds
         return winner_playoff
+
+
+class PlayoffsBatch:
+    """Vectorized version of Playoffs to play the playoffs of many iterations at once.
+    The bracket is a fixed tree of 16 slots, the eight teams of each conference being
+    placed in the ConferenceTournament order, west conference first. Each round pairs
+    the slots two by two, the first slot having the home court advantage, and every
+    series of the round is resolved for all the iterations with one random draw.
+
+    Args:
+        matchups (MatchupTable): Matchup probabilities of the teams.
+        rng (np.random.Generator): Random generator used to play the series.
+    """
+
+    CONFERENCES = ["ouest", "est"]
+    START_GAMES_ORDER = [0, 7, 3, 4, 2, 5, 1, 6]
+    N_ROUNDS = 4
+
+    def __init__(self, matchups, rng):
+        self.series = matchups.series
+        self.n_teams = self.series.shape[0]
+        self.rng = rng
+
+    @classmethod
+    def seeds_array(cls, seasons_teams_ranked, team_ids):
+        """Convert the ranked teams of many iterations to an array of teams ids.
+
+        Args:
+            seasons_teams_ranked (list(dict)): Dictionnaries of k: v with k the
+            conference and v the ranked teams list to play the playoffs.
+            team_ids (dict): Dictionnary of k: v with k the team name and v its id.
+
+        Returns:
+            np.array(int): Teams ids of shape (n_iter, 2, 8), by conference and rank.
+        """
+        return np.array(
+            [
+                [[team_ids[t] for t in ranked[conf]] for conf in cls.CONFERENCES]
+                for ranked in seasons_teams_ranked
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 2, 8)
+
+    def play(self, seeds, reached=False):
+        """Play the playoffs of many iterations.
+
+        Args:
+            seeds (np.array(int)): Teams ids of shape (n_iter, 2, 8), see seeds_array.
+            reached (bool, optional): Also return the number of rounds each team plays
+            in each iteration. Defaults to False.
+
+        Returns:
+            tuple(np.array(int), np.array(int)): Champion id of each iteration, number
+            of iterations in which each team plays each round and wins the title, of
+            shape (n_teams, N_ROUNDS + 1). If reached, a third array of shape (n_iter,
+            n_teams) with the number of rounds played by each team, plus one for the
+            champion.
+        """
+        slots = seeds[:, :, self.START_GAMES_ORDER].reshape(len(seeds), -1)
+        counts = np.zeros((self.n_teams, self.N_ROUNDS + 1), dtype=np.int64)
+        if reached:
+            rows = np.arange(len(seeds))[:, None]
+            teams_reached = np.zeros((len(seeds), self.n_teams), dtype=np.uint8)
+        for r in range(self.N_ROUNDS):
+            counts[:, r] = np.bincount(slots.ravel(), minlength=self.n_teams)
+            if reached:
+                teams_reached[rows, slots] += 1
+            first, second = slots[:, 0::2], slots[:, 1::2]
+            first_wins = self.rng.random(first.shape) < self.series[first, second]
+            slots = np.where(first_wins, first, second)
+        champions = slots[:, 0]
+        counts[:, self.N_ROUNDS] = np.bincount(champions, minlength=self.n_teams)
+        if reached:
+            teams_reached[rows, slots] += 1
+            return champions, counts, teams_reached
+        return champions, counts
@@ -0,0 +1,41 @@
+import argparse
+from pathlib import Path
+from simulation.sweep import load_sweep_spec, run_sweep
+from utls.cli import check_positive
+
+
+if __name__ == "__main__":
+
+    data_path = Path(__file__).parent / "data"
+
+    parser = argparse.ArgumentParser(
+        description="Run the simulations of a grid of scenarios (seasons, game model, "
+        "home advantage and number of simulations) in one process pool, loading the "
+        "data once, and save the probabilities of winning of all of them in one "
+        "parquet file."
+    )
+    parser.add_argument(
+        "spec",
+        help="JSON (or YAML if PyYAML is installed) file of the sweep specification.",
+    )
+    parser.add_argument(
+        "output",
+        help="Parquet file where to write the results, one row by scenario and team.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=check_positive,
+        default=1,
+        help="Number of processes to split the scenarios across.",
+    )
+
+    args = parser.parse_args()
+    spec = load_sweep_spec(args.spec)
+    results = run_sweep(data_path, spec, workers=args.workers)
+    results.to_parquet(args.output, index=False)
+    print(
+        f"{results['scenario'].nunique()} scenarios written to {args.output}:\n"
+        + results.loc[results.groupby("scenario")["probability"].idxmax()]
+        .drop(columns=["scenario"])
+        .to_string(index=False)
+    )
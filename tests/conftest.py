@@ -0,0 +1,23 @@
+from pathlib import Path
+import pytest
+from utls.games_data import load_games_data
+from utls.regular_season_calendar import construct_calendar
+
+DATA_PATH = Path(__file__).parents[1] / "data"
+SEASON_TO_PLAY = 2018
+SEASON_DATA = 2017
+
+
+@pytest.fixture(scope="session")
+def data_path():
+    return DATA_PATH
+
+
+@pytest.fixture(scope="session")
+def games_data():
+    return load_games_data(DATA_PATH, seasons=[SEASON_TO_PLAY, SEASON_DATA])
+
+
+@pytest.fixture(scope="session")
+def calendar(games_data):
+    return construct_calendar(games_data.games, SEASON_TO_PLAY)
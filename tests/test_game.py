@@ -0,0 +1,46 @@
+import random as rnd
+import pytest
+from simulation.game import GameBootstrap, GameElo, GameNaive
+from simulation.nbasim import NBASim
+from simulation.tournament import Playoffs
+from utls.results import wilson_interval
+
+N_GAMES = 20000
+
+
+@pytest.fixture(scope="module")
+def sim(data_path, games_data):
+    return NBASim(data_path, 2018, 2017, seed=1, games_data=games_data)
+
+
+@pytest.mark.parametrize("game_model", [GameNaive, GameBootstrap])
+def test_play_matches_matchup_table(sim, game_model):
+    gsim = game_model(False)
+    home_win = gsim.matchup_table(sim.teams).home_win
+    names = sim.teams.teams_names
+    rnd.seed(0)
+    for i, j in [(0, 1), (5, 17)]:
+        team1, team2 = sim.teams.dteams[names[i]], sim.teams.dteams[names[j]]
+        wins = sum(gsim.play(team1, team2) for _ in range(N_GAMES))
+        low, high = wilson_interval(wins, N_GAMES, 0.999)
+        assert low <= home_win[i, j] <= high
+
+
+def test_play_updates_teams(sim):
+    teams = NBASim(sim.data_path, 2018, 2017, games_data=sim.games_data).teams
+    team1, team2 = (teams.dteams[t] for t in teams.teams_names[:2])
+    res, t1, t2 = GameNaive(True).play(team1, team2, return_pts=True)
+    assert t1 != t2 and res == int(t1 > t2)
+    assert (team1.pts[-1], team1.opp_pts[-1]) == (t1, t2)
+    assert (team2.pts[-1], team2.opp_pts[-1]) == (t2, t1)
+
+
+def test_elo_game_by_game_rejected(data_path, games_data):
+    sim = NBASim(
+        data_path, 2018, 2018, method="elo", playoffs_only=True, games_data=games_data
+    )
+    season_teams_ranked, _ = sim.standings.get_playoffs(sim.calendar_ylabel)
+    for gsim, game_by_game in [(GameElo(), True), (GameElo(True), False)]:
+        playoffs = Playoffs(season_teams_ranked, gsim, game_by_game=game_by_game)
+        with pytest.raises(ValueError):
+            playoffs.get_winner(sim.teams)
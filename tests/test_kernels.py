@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from simulation.game import GameNaive
+from simulation.kernels import _naive_seasons, naive_seasons
+from simulation.nbasim import NBASim
+from simulation.season import Season
+from simulation.teams import TeamsState
+
+# Games of the calendar played, and seasons compared in distribution.
+N_GAMES = 300
+N_SEASONS = 300
+
+
+class FakeNormal:
+    """Deterministic normal draws, the draws of a same (loc, scale) pair moving away
+    from each other so that tied games end up decided."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def __call__(self, loc, scale):
+        loc, scale = float(loc), float(scale)
+        k = self.counts.get((loc, scale), 0)
+        self.counts[(loc, scale)] = k + 1
+        return loc + (0.37 + k * ((loc * 7.3) % 1 + 0.5)) * scale
+
+    def normal(self, loc, scale):
+        loc, scale = np.broadcast_arrays(loc, scale)
+        draws = [self(x, s) for x, s in zip(loc.ravel(), scale.ravel())]
+        return np.array(draws).reshape(loc.shape)
+
+
+@pytest.fixture(autouse=True)
+def global_random_state():
+    # The uncompiled kernel seeds the global generator of NumPy.
+    state = np.random.get_state()
+    yield
+    np.random.set_state(state)
+
+
+@pytest.fixture(scope="module")
+def sim(data_path, games_data):
+    return NBASim(
+        data_path, 2018, 2017, seed=42, games_data=games_data, teams_update=True
+    )
+
+
+@pytest.fixture()
+def season(sim):
+    home_idx, away_idx = sim.season._games_idx(sim.teams)
+    return Season(
+        None,
+        None,
+        GameNaive(True),
+        rng=np.random.default_rng(0),
+        games_idx=(home_idx[:N_GAMES], away_idx[:N_GAMES]),
+    )
+
+
+def _play_kernel(sim, season, n_seasons, seed):
+    home_idx, away_idx = season.games_idx
+    state = TeamsState(sim.teams, 1)
+    return _naive_seasons(
+        home_idx,
+        away_idx,
+        state.pts[0],
+        state.opp_pts[0],
+        state.position,
+        state.size,
+        GameNaive.HADVG,
+        n_seasons,
+        seed,
+    )
+
+
+def _wins(season, ylabel, n_teams):
+    home_idx, away_idx = season.games_idx
+    rows = np.arange(len(ylabel))[:, None]
+    wins = np.zeros((len(ylabel), n_teams), dtype=np.int64)
+    np.add.at(wins, (rows, home_idx), ylabel)
+    np.add.at(wins, (rows, away_idx), 1 - ylabel)
+    return wins
+
+
+def test_kernel_matches_rounds_with_same_draws(sim, season, monkeypatch):
+    season.rng = FakeNormal()
+    ylabel, home_pts, away_pts = season._play_rounds_updating_teams(sim.teams, 1)
+    monkeypatch.setattr(np.random, "normal", FakeNormal())
+    k_home_pts, k_away_pts, k_ylabel = _play_kernel(sim, season, 1, 0)
+    np.testing.assert_array_equal(k_home_pts, home_pts)
+    np.testing.assert_array_equal(k_away_pts, away_pts)
+    np.testing.assert_array_equal(k_ylabel, ylabel)
+
+
+def test_kernel_wins_distribution(sim, season):
+    n_teams = len(sim.teams.team_ids)
+    ylabel, _, _ = season._play_rounds_updating_teams(sim.teams, N_SEASONS)
+    _, _, k_ylabel = _play_kernel(sim, season, N_SEASONS, 1)
+    wins = _wins(season, ylabel, n_teams)
+    k_wins = _wins(season, k_ylabel, n_teams)
+    # Difference of the mean wins of each team, in standard errors.
+    std_err = np.sqrt((wins.var(axis=0) + k_wins.var(axis=0)) / N_SEASONS)
+    z = (k_wins.mean(axis=0) - wins.mean(axis=0)) / np.maximum(std_err, 1e-9)
+    assert np.abs(z).max() < 4
+    # Wins spread, pooled over the teams.
+    assert k_wins.std(axis=0).mean() == pytest.approx(wins.std(axis=0).mean(), rel=0.1)
+
+
+@pytest.mark.skipif(naive_seasons is not None, reason="Numba is installed.")
+def test_kernel_without_numba_falls_back(sim):
+    with pytest.warns(UserWarning, match="Numba"):
+        gsim = GameNaive(True, kernel=True)
+    assert not gsim.kernel
+    assert gsim.play_seasons(None, None, sim.teams, 1, None) is None
+
+
+def test_kernel_needs_integer_home_advantage():
+    with pytest.raises(ValueError):
+        GameNaive(True, hadvg=2.5, kernel=True)
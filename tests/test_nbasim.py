@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from simulation.nbasim import NBASim
+from utls.checkpoint import load_checkpoint, save_checkpoint
+from utls.counters import SimulationCounters
+from utls.results import wilson_interval
+
+N_ITER = 2000
+
+
+def _sim(data_path, games_data, seed=3, **kwargs):
+    sim = NBASim(data_path, 2018, 2017, seed=seed, games_data=games_data, **kwargs)
+    # Also seeds the global generators of the scalar path.
+    sim.reseed(np.random.SeedSequence(seed))
+    return sim
+
+
+def _mean_wins(counters):
+    wins = np.arange(counters.wins.shape[1])
+    n_iter = counters.wins.sum(axis=1)
+    mean = (counters.wins * wins).sum(axis=1) / n_iter
+    var = (counters.wins * wins**2).sum(axis=1) / n_iter - mean**2
+    return mean, var / n_iter
+
+
+@pytest.fixture(scope="module")
+def scalar_run(data_path, games_data):
+    sim = _sim(data_path, games_data)
+    titles = sim.play_simulation(N_ITER, progress=False)
+    return titles, sim.counters
+
+
+@pytest.mark.parametrize("block_size", [1, 500])
+def test_block_matches_scalar(data_path, games_data, scalar_run, block_size):
+    titles, counters = scalar_run
+    sim = _sim(data_path, games_data, block_size=block_size)
+    block_titles = sim.play_simulation(N_ITER, progress=False)
+    for team, n_titles in titles.items():
+        low, high = wilson_interval(n_titles, N_ITER, 0.999)
+        block_low, block_high = wilson_interval(block_titles[team], N_ITER, 0.999)
+        # The confidence intervals of both runs overlap.
+        assert block_low <= high and low <= block_high, team
+    mean, var = _mean_wins(counters)
+    block_mean, block_var = _mean_wins(sim.counters)
+    z = (block_mean - mean) / np.sqrt(var + block_var)
+    assert np.abs(z).max() < 4
+
+
+def test_workers_deterministic(data_path, games_data):
+    runs = []
+    for _ in range(2):
+        sim = _sim(data_path, games_data, block_size=100)
+        titles = sim.play_simulation(400, workers=2, progress=False)
+        runs.append((titles, sim.counters.to_dict()))
+    assert sum(runs[0][0].values()) == 400
+    assert runs[0][0] == runs[1][0]
+    for key in ["seeds", "rounds", "wins"]:
+        np.testing.assert_array_equal(runs[0][1][key], runs[1][1][key])
+
+
+@pytest.mark.parametrize("block_size", [None, 100])
+def test_resume_matches_straight_run(data_path, games_data, tmp_path, block_size):
+    path = tmp_path / "checkpoint.json"
+    sim = _sim(data_path, games_data, block_size=block_size)
+    for n_done, results in sim.iter_simulation(300, chunk=100):
+        if n_done == 100:
+            save_checkpoint(
+                path,
+                {},
+                n_done,
+                results,
+                sim.get_random_state(),
+                sim.counters.to_dict(),
+            )
+    # Resumed from the first chunk, after the generators moved on.
+    checkpoint = load_checkpoint(path)
+    resumed = _sim(data_path, games_data, seed=4, block_size=block_size)
+    resumed.set_random_state(checkpoint["random_state"])
+    resumed.counters = SimulationCounters.from_dict(checkpoint["counters"])
+    for resumed_done, resumed_results in resumed.iter_simulation(
+        300,
+        chunk=100,
+        final_wins=checkpoint["final_wins"],
+        n_done=checkpoint["n_done"],
+    ):
+        pass
+    assert (resumed_done, resumed_results) == (n_done, results)
+    for key in ["seeds", "rounds", "wins"]:
+        np.testing.assert_array_equal(
+            resumed.counters.to_dict()[key], sim.counters.to_dict()[key]
+        )
@@ -0,0 +1,85 @@
+import random as rnd
+import numpy as np
+import pytest
+from simulation.game import GameBootstrap
+from simulation.nbasim import NBASim
+from simulation.probabilities import (
+    MatchupTable,
+    bootstrap_game_probabilities,
+    bracket_probabilities,
+    series_win_probabilities,
+)
+from simulation.tournament import Playoffs, PlayoffsBatch
+from utls.results import wilson_interval
+
+N_ITER = 10000
+N_ITER_BATCH = 100000
+N_GAMES = 200000
+
+
+@pytest.fixture(scope="module")
+def playoffs_sim(data_path):
+    return NBASim(data_path, 2018, 2018, playoffs_only=True, seed=1)
+
+
+def test_series_win_probabilities_closed_forms():
+    p = np.array([0.0, 0.5, 1.0])
+    np.testing.assert_allclose(series_win_probabilities(p, p), [0.0, 0.5, 1.0])
+    # Each team winning its home games, the team with four home games wins.
+    assert series_win_probabilities(1.0, 0.0) == pytest.approx(1.0)
+
+
+def test_playoffs_probabilities_match_game_by_game(playoffs_sim):
+    exact = playoffs_sim.playoffs_probabilities()
+    assert sum(exact.values()) == pytest.approx(1.0)
+    season_teams_ranked, _ = playoffs_sim.standings.get_playoffs(
+        playoffs_sim.calendar_ylabel
+    )
+    rnd.seed(5)
+    titles = dict.fromkeys(exact, 0)
+    for _ in range(N_ITER):
+        playoffs = Playoffs(season_teams_ranked, playoffs_sim.gsim, game_by_game=True)
+        titles[playoffs.get_winner(playoffs_sim.teams)] += 1
+    for team, probability in exact.items():
+        low, high = wilson_interval(titles[team], N_ITER, 0.999)
+        assert low <= probability <= high, team
+
+
+@pytest.mark.parametrize("random_table", [False, True])
+def test_playoffs_batch_matches_bracket(playoffs_sim, random_table):
+    team_ids = playoffs_sim.teams.team_ids
+    matchups = playoffs_sim.gsim.matchup_table(playoffs_sim.teams)
+    if random_table:
+        # Far from symmetric, so that swapping the home side of a series shows.
+        rng = np.random.default_rng(0)
+        matchups = MatchupTable(rng.uniform(0.05, 0.95, matchups.home_win.shape))
+    season_teams_ranked, _ = playoffs_sim.standings.get_playoffs(
+        playoffs_sim.calendar_ylabel
+    )
+    exact = bracket_probabilities(season_teams_ranked, team_ids, matchups.series)
+    seeds = PlayoffsBatch.seeds_array([season_teams_ranked], team_ids)
+    playoffs = PlayoffsBatch(matchups, np.random.default_rng(1))
+    _, counts = playoffs.play(np.repeat(seeds, N_ITER_BATCH, axis=0))
+    for (team, r), probability in np.ndenumerate(exact):
+        low, high = wilson_interval(counts[team, r], N_ITER_BATCH, 0.9999)
+        assert low <= probability <= high, (team, r)
+
+
+@pytest.mark.parametrize("hadvg", [1, 0, -3])
+def test_bootstrap_probabilities_match_play_batch(playoffs_sim, hadvg):
+    pools = playoffs_sim.teams.score_pools()
+    home_win, tie = bootstrap_game_probabilities(pools, hadvg)
+    table = MatchupTable.from_pools(pools, hadvg)
+    gsim = GameBootstrap(False, hadvg=hadvg)
+    rng = np.random.default_rng(hadvg + 10)
+    for i, j in [(0, 1), (5, 17), (20, 3)]:
+        home_ids, away_ids = np.full(N_GAMES, i), np.full(N_GAMES, j)
+        # Regulation results, ties included.
+        t1, t2 = gsim._draw(pools, home_ids, away_ids, None, rng)
+        for n, probability in [((t1 > t2).sum(), home_win), ((t1 == t2).sum(), tie)]:
+            low, high = wilson_interval(n, N_GAMES, 0.9999)
+            assert low <= probability[i, j] <= high, (i, j)
+        # Final results, the tied games being played again.
+        _, _, y = gsim.play_batch(home_ids, away_ids, pools, rng)
+        low, high = wilson_interval(y.sum(), N_GAMES, 0.9999)
+        assert low <= table.home_win[i, j] <= high, (i, j)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utls.regular_season_calendar import construct_calendar, played_games
+
+GAME_IDS = np.array(["201810160BOS", "201810160GSW", "201810170CHO", "201810180MIA"])
+
+
+@pytest.mark.parametrize("as_of", ["20181017", "2018-10-17"])
+def test_played_games_date(as_of):
+    assert played_games(GAME_IDS, as_of).tolist() == [True, True, False, False]
+
+
+def test_played_games_game_id():
+    played = played_games(GAME_IDS, "201810170CHO")
+    assert played.tolist() == [True, True, True, False]
+
+
+@pytest.mark.parametrize(
+    "as_of", ["20180230", "2018-13-01", "2018/10/17", "2018-1017", "201810170ATL", ""]
+)
+def test_played_games_invalid(as_of):
+    with pytest.raises(ValueError):
+        played_games(GAME_IDS, as_of)
+
+
+@pytest.mark.parametrize("season", [2017, 2018])
+def test_calendar_from_season_index(games_data, season):
+    calendar = construct_calendar(games_data.season_games(season), season)
+    expected = construct_calendar(games_data.games, season)
+    pd.testing.assert_frame_equal(calendar, expected)
+    assert list(games_data.teams_from_season(season)) == list(
+        games_data.games.loc[games_data.games["season"] == season, "away_name"].unique()
+    )
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from simulation.nbasim import NBASim
+from utls.result_store import load_results_store, store_files
+
+
+@pytest.mark.parametrize("block_size", [None, 100])
+def test_store_round_trip(data_path, games_data, tmp_path, block_size):
+    sim = NBASim(
+        data_path, 2018, 2017, seed=2, games_data=games_data, block_size=block_size
+    )
+    store = sim.new_results_store(tmp_path, chunk_rows=70)
+    # Each worker writes through its own spawned store.
+    titles = sim.play_simulation(300, workers=2, progress=False, store=store)
+    names = [f.name for f in store_files(tmp_path)]
+    assert {name[: len("part-000-")] for name in names} == {"part-000-", "part-001-"}
+    # Several files by worker, the buffer being written by chunks of 70 rows.
+    assert len(names) >= 4
+    store_titles, n_iter, counters = load_results_store(tmp_path)
+    assert n_iter == 300
+    assert store_titles == titles
+    assert counters.team_names == sim.counters.team_names
+    for key in ["seeds", "rounds", "wins"]:
+        np.testing.assert_array_equal(
+            getattr(counters, key), getattr(sim.counters, key)
+        )
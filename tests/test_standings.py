@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from utls.playoffs import get_playoffs
+from utls.standings import Standings
+
+N_CALENDARS = 300
+
+
+@pytest.fixture(scope="module")
+def standings(calendar, games_data):
+    team_ids = {t: i for i, t in enumerate(sorted(set(calendar["home_name"])))}
+    return Standings.from_calendar(calendar, games_data.teams_info, team_ids)
+
+
+def _random_results(rng, n_games):
+    # Results close to a coin flip give many ties in the standings.
+    return (rng.random(n_games) < rng.uniform(0.3, 0.7)).astype(np.int64)
+
+
+def test_get_playoffs_matches_pandas(standings, calendar, games_data):
+    rng = np.random.default_rng(0)
+    results = calendar.copy()
+    for i in range(N_CALENDARS):
+        ylabel = _random_results(rng, len(calendar))
+        results["ylabel"] = ylabel
+        np.random.seed(i)
+        expected, _ = get_playoffs(results, games_data.teams_info)
+        expected_state = np.random.get_state()[2]
+        np.random.seed(i)
+        ranked, _ = standings.get_playoffs(ylabel)
+        # The tie-breakers draw the same random numbers.
+        assert ranked == expected, i
+        assert np.random.get_state()[2] == expected_state, i
+
+
+def test_get_playoffs_many_matches_single(standings, calendar):
+    rng = np.random.default_rng(1)
+    ylabel = np.stack([_random_results(rng, len(calendar)) for _ in range(50)])
+    np.random.seed(5)
+    many, wins = standings.get_playoffs_many(ylabel)
+    np.random.seed(5)
+    single = [standings.get_playoffs(y) for y in ylabel]
+    assert many == [ranked for ranked, _ in single]
+    assert (wins == np.stack([w for _, w in single])).all()
+
+
+def test_subset_games_least_recently_used(calendar, games_data):
+    team_ids = {t: i for i, t in enumerate(sorted(set(calendar["home_name"])))}
+    standings = Standings.from_calendar(calendar, games_data.teams_info, team_ids)
+    standings.SUBSETS_CACHE_SIZE = 2
+    subsets = [[0, 1, 2], [3, 4], [5, 6, 7]]
+    counts = [standings._subset_games(s) for s in subsets[:2]]
+    # The first subset is used again, so the second one is evicted.
+    assert standings._subset_games(subsets[0]) == counts[0]
+    standings._subset_games(subsets[2])
+    assert list(standings._subsets_games) == [
+        frozenset(subsets[0]),
+        frozenset(subsets[2]),
+    ]
+    assert standings._subset_games(subsets[1]) == counts[1]
@@ -0,0 +1,26 @@
+import pytest
+from benchmarks.bench import STARTUP_RUNS, measure_startup
+from utls.season_artifact import SOURCE_FILES, prepare_season_artifact
+
+
+@pytest.fixture(scope="module")
+def startup_data_path(data_path, tmp_path_factory):
+    # The artifact run writes its artifact in this folder instead of data.
+    path = tmp_path_factory.mktemp("data")
+    for name in SOURCE_FILES:
+        (path / name).symlink_to(data_path / name)
+    prepare_season_artifact(path, 2018, 2018)
+    return path
+
+
+@pytest.mark.parametrize("name", list(STARTUP_RUNS))
+def test_startup_imports(startup_data_path, name):
+    result = measure_startup(repeat=1, names=[name], data_path=startup_data_path)
+    assert result[name]["forbidden"] == []
+
+
+@pytest.mark.timing
+@pytest.mark.parametrize("name", list(STARTUP_RUNS))
+def test_startup_budget(startup_data_path, name):
+    result = measure_startup(names=[name], data_path=startup_data_path)[name]
+    assert result["seconds"] <= result["budget"]
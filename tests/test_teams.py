@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from simulation.probabilities import MatchupTable
+from simulation.teams import TeamsNaive
+
+
+@pytest.fixture()
+def teams(data_path, games_data):
+    return TeamsNaive(data_path, 2018, 2017, games_data=games_data)
+
+
+@pytest.mark.parametrize("bootstrap", [False, True])
+def test_matchup_table_cached_until_update(teams, bootstrap):
+    table = teams.matchup_table(1, bootstrap=bootstrap)
+    assert teams.matchup_table(1, bootstrap=bootstrap) is table
+    pools = teams.score_pools()
+    assert teams.score_pools() is pools
+    # A blowout of the first team makes it stronger against every other one.
+    teams.dteams[teams.teams_names[0]].update_last_game(160, 60)
+    updated_pools = teams.score_pools()
+    updated = teams.matchup_table(1, bootstrap=bootstrap)
+    assert updated_pools is not pools
+    assert updated is not table
+    if bootstrap:
+        expected = MatchupTable.from_pools(updated_pools, 1)
+    else:
+        expected = MatchupTable.from_features(teams.features_arrays(), 1)
+    np.testing.assert_array_equal(updated.home_win, expected.home_win)
+    assert (updated.home_win[0, 1:] > table.home_win[0, 1:]).all()
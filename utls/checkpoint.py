@@ -0,0 +1,42 @@
+import json
+import os
+
+
+def save_checkpoint(path, params, n_done, final_wins, random_state, counters=None):
+    """Save the partial results of a simulation to resume it later. The file is written
+    to a temporary file first, so that a killed job never leaves a truncated checkpoint.
+
+    Args:
+        path (str): Path of the checkpoint file (json).
+        params (dict): Parameters of the simulation, checked when resuming.
+        n_done (int): Number of iterations done.
+        final_wins (dict): Dictionnary with team: number of time it won the championship.
+        random_state (dict): State of the random generators, see NBASim.get_random_state.
+        counters (dict, optional): Counters of the simulation, see
+        SimulationCounters.to_dict. Defaults to None.
+    """
+    checkpoint = {
+        "params": params,
+        "n_done": n_done,
+        "final_wins": final_wins,
+        "random_state": random_state,
+        "counters": counters,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """Load the partial results of a simulation.
+
+    Args:
+        path (str): Path of the checkpoint file (json).
+
+    Returns:
+        dict: Checkpoint with params, n_done, final_wins, random_state and counters
+        keys.
+    """
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,21 @@
+import argparse
+
+
+def check_positive(value):
+    ivalue = int(value)
+    if ivalue <= 0:
+        raise argparse.ArgumentTypeError("%s is an invalid positive int value" % value)
+    return ivalue
+
+
+def check_probability(value):
+    fvalue = float(value)
+    if not 0 < fvalue < 1:
+        raise argparse.ArgumentTypeError("%s is an invalid probability value" % value)
+    return fvalue
+
+
+def boolean_string(s):
+    if s not in {"False", "True"}:
+        raise ValueError("Not a valid boolean string")
+    return s == "True"
@@ -0,0 +1,87 @@
+import numpy as np
+
+ROUNDS = ["First round", "Conf. semifinals", "Conf. finals", "Finals", "Champion"]
+
+
+class SimulationCounters:
+    """Counters of the playoffs seeds, playoffs rounds reached and regular season wins
+    of the teams, accumulated over the iterations in preallocated arrays indexed by
+    team id.
+
+    Args:
+        team_names (list(str)): Teams names, indexed by team id.
+        max_wins (int): Maximum number of regular season wins of a team.
+        n_seeds (int, optional): Number of playoffs teams by conference. Defaults to 8.
+    """
+
+    def __init__(self, team_names, max_wins, n_seeds=8):
+        self.team_names = list(team_names)
+        self.n_teams = len(self.team_names)
+        self.max_wins = max_wins
+        self.n_seeds = n_seeds
+        # Last column counts the iterations where the team misses the playoffs.
+        self.seeds = np.zeros((self.n_teams, n_seeds + 1), dtype=np.int64)
+        self.rounds = np.zeros((self.n_teams, len(ROUNDS)), dtype=np.int64)
+        self.wins = np.zeros((self.n_teams, max_wins + 1), dtype=np.int64)
+
+    def add(self, seeds, rounds, wins):
+        """Add the results of a batch of iterations.
+
+        Args:
+            seeds (np.array(int)): Playoffs teams ids of shape (n_iter, n_conferences,
+            n_seeds), by conference and rank.
+            rounds (np.array(int)): Number of iterations in which each team plays each
+            round and wins the title, of shape (n_teams, len(ROUNDS)).
+            wins (np.array(int)): Regular season wins of shape (n_iter, n_teams).
+        """
+        seeds = seeds.reshape(len(seeds), -1, self.n_seeds)
+        cells = (seeds * (self.n_seeds + 1) + np.arange(self.n_seeds)).ravel()
+        seeds_counts = np.bincount(cells, minlength=self.seeds.size)
+        seeds_counts = seeds_counts.reshape(self.seeds.shape)
+        self.seeds += seeds_counts
+        self.seeds[:, -1] += len(seeds) - seeds_counts.sum(axis=1)
+        self.rounds += rounds
+        cells = (np.arange(self.n_teams) * (self.max_wins + 1) + wins).ravel()
+        wins_counts = np.bincount(cells, minlength=self.wins.size)
+        self.wins += wins_counts.reshape(self.wins.shape)
+
+    def merge(self, other):
+        """Add the counters of another simulation, like the one of a worker.
+
+        Args:
+            other (SimulationCounters): Counters to add.
+        """
+        self.seeds += other.seeds
+        self.rounds += other.rounds
+        self.wins += other.wins
+
+    def to_dict(self):
+        """Convert the counters to a dictionnary which can be serialized to JSON.
+
+        Returns:
+            dict: Counters as lists.
+        """
+        return {
+            "team_names": self.team_names,
+            "seeds": self.seeds.tolist(),
+            "rounds": self.rounds.tolist(),
+            "wins": self.wins.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        """Build the counters from a dictionnary made by to_dict.
+
+        Args:
+            d (dict): Counters as lists.
+
+        Returns:
+            SimulationCounters: Counters.
+        """
+        wins = np.array(d["wins"], dtype=np.int64)
+        seeds = np.array(d["seeds"], dtype=np.int64)
+        counters = cls(d["team_names"], wins.shape[1] - 1, seeds.shape[1] - 1)
+        counters.seeds += seeds
+        counters.rounds += np.array(d["rounds"], dtype=np.int64)
+        counters.wins += wins
+        return counters
@@ -0,0 +1,114 @@
+from functools import lru_cache
+import numpy as np
+
+GAMES_COLUMNS = [
+    "game_id",
+    "season",
+    "away_id",
+    "home_id",
+    "away_name",
+    "home_name",
+    "away_ftscore",
+    "home_ftscore",
+    "ylabel",
+]
+
+
+class GamesData:
+    """Games and teams data shared by the simulation objects. Only the needed columns
+    and seasons of the games table are read, and the games are indexed by season and
+    the points scored by each team by season and team once.
+
+    Args:
+        data_path (str): Path to the data folder.
+        seasons (list(int), optional): Seasons to load, the filter being pushed down to
+        the parquet reader. Defaults to None (all seasons).
+    """
+
+    def __init__(self, data_path, seasons=None):
+        import pandas as pd
+        import pyarrow.dataset as ds
+
+        self.data_path = data_path
+        self.seasons = seasons
+        dataset = ds.dataset(f"{data_path}/BasketRefGames.snappy.parquet")
+        season_filter = None
+        if seasons is not None:
+            season_filter = ds.field("season").isin(list(seasons))
+        self.games = dataset.to_table(
+            columns=GAMES_COLUMNS, filter=season_filter
+        ).to_pandas()
+        self.teams_info = pd.read_csv(f"{data_path}/teams_info.csv")
+        self.season_rows = self.games.groupby("season").indices
+        self.season_scores = self._index_season_scores()
+
+    def _index_season_scores(self):
+        """Index the points scored by each team and its opponents, away games first.
+
+        Returns:
+            dict: Dictionnary of k: v with k the (season, team) and v the tuple of points
+            scored by the team and by its opponents.
+        """
+        away = {
+            k: (g["away_ftscore"].values, g["home_ftscore"].values)
+            for k, g in self.games.groupby(["season", "away_name"])
+        }
+        home = {
+            k: (g["home_ftscore"].values, g["away_ftscore"].values)
+            for k, g in self.games.groupby(["season", "home_name"])
+        }
+        empty = (np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+        season_scores = {}
+        for k in set(away) | set(home):
+            away_pts, away_ptsr = away.get(k, empty)
+            home_pts, home_ptsr = home.get(k, empty)
+            season_scores[k] = (
+                np.concatenate((away_pts, home_pts)),
+                np.concatenate((away_ptsr, home_ptsr)),
+            )
+        return season_scores
+
+    def season_games(self, season):
+        """Get the games of a season, sorted by game id.
+
+        Args:
+            season (int): Season of the games.
+
+        Returns:
+            pd.DataFrame: Games of the season.
+        """
+        games = self.games.iloc[self.season_rows.get(season, [])]
+        return games.sort_values(by=["game_id"])
+
+    def teams_from_season(self, season):
+        """Extract teams name from a specific season.
+
+        Args:
+            season (int): Season from which to extract the teams.
+
+        Returns:
+            np.array(str): Teams name.
+        """
+        rows = self.season_rows.get(season, [])
+        return self.games["away_name"].iloc[rows].unique()
+
+
+@lru_cache(maxsize=8)
+def _load_games_data(data_path, seasons):
+    return GamesData(data_path, seasons)
+
+
+def load_games_data(data_path, seasons=None):
+    """Load the games data, reusing the one already loaded in the process for the same
+    data path and seasons.
+
+    Args:
+        data_path (str): Path to the data folder.
+        seasons (list(int), optional): Seasons to load. Defaults to None (all seasons).
+
+    Returns:
+        GamesData: Games data.
+    """
+    if seasons is not None:
+        seasons = tuple(sorted(set(seasons)))
+    return _load_games_data(str(data_path), seasons)
@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-import scipy as sc
 
 
 def get_wins_by_team(df):
@@ -0,0 +1,157 @@
+import json
+import time
+from contextlib import nullcontext
+
+# Phase of the NullProfiler, entered and exited without doing anything.
+_NULL_PHASE = nullcontext()
+
+
+class NullProfiler:
+    """Profiler used when profiling is disabled. Its phases do nothing, so that the
+    instrumented code only pays a method call.
+    """
+
+    enabled = False
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+    def reset(self):
+        return self
+
+    def merge(self, other):
+        pass
+
+
+class _Phase:
+    """Context manager timing one run of a phase of a PhaseProfiler."""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.profiler._event("O", self.name, self.start)
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler._event("C", self.name, end)
+        totals = self.profiler.totals
+        calls = self.profiler.calls
+        totals[self.name] = totals.get(self.name, 0) + end - self.start
+        calls[self.name] = calls.get(self.name, 0) + 1
+
+
+class PhaseProfiler:
+    """Profiler recording the cumulative wall time and the number of calls of named
+    phases of a simulation, like the data loading, the regular seasons or the
+    tie-breakers. Phases can be nested, the time of a phase including the one of the
+    phases run inside it.
+
+    Args:
+        record_events (bool, optional): Also record the start and end of each phase run,
+        to export a timeline with to_speedscope. Defaults to False.
+    """
+
+    enabled = True
+
+    def __init__(self, record_events=False):
+        self.record_events = record_events
+        self.totals = {}
+        self.calls = {}
+        self.events = []
+        self.start = time.perf_counter()
+
+    def phase(self, name):
+        """Time a run of a phase.
+
+        Args:
+            name (str): Name of the phase.
+
+        Returns:
+            Context manager to run the phase in.
+        """
+        return _Phase(self, name)
+
+    def _event(self, kind, name, at):
+        if self.record_events:
+            self.events.append((kind, name, at - self.start))
+
+    def reset(self):
+        """Create an empty profiler with the same options, like for a worker process.
+
+        Returns:
+            PhaseProfiler: Empty profiler.
+        """
+        return PhaseProfiler(self.record_events)
+
+    def merge(self, other):
+        """Add the totals of another profiler, like the one of a worker. Its events are
+        not merged, their timeline being another one.
+
+        Args:
+            other (PhaseProfiler): Profiler to add.
+        """
+        for name, total in other.totals.items():
+            self.totals[name] = self.totals.get(name, 0) + total
+            self.calls[name] = self.calls.get(name, 0) + other.calls[name]
+
+    def summary(self):
+        """Summarize the phases, in the order of their first run.
+
+        Returns:
+            str: Table of the phases calls, total time, mean time by call and share of
+            the wall time since the creation of the profiler.
+        """
+        from tabulate import tabulate
+
+        wall = time.perf_counter() - self.start
+        table = [
+            [
+                name,
+                self.calls[name],
+                total,
+                1000 * total / self.calls[name],
+                100 * total / wall,
+            ]
+            for name, total in self.totals.items()
+        ]
+        headers = ["Phase", "Calls", "Total (s)", "Mean (ms)", "Wall time (%)"]
+        return (
+            tabulate(table, headers=headers, floatfmt=".3f")
+            + f"\nWall time: {wall:.3f}s"
+        )
+
+    def to_speedscope(self, path, name="NBASim"):
+        """Export the recorded phases runs as an evented profile of speedscope
+        (https://www.speedscope.app).
+
+        Args:
+            path (str): Path of the json file to write.
+            name (str, optional): Name of the profile. Defaults to "NBASim".
+        """
+        frames = {}
+        events = []
+        for kind, phase, at in self.events:
+            frame = frames.setdefault(phase, len(frames))
+            events.append({"type": kind, "frame": frame, "at": at})
+        end = self.events[-1][2] if self.events else 0
+        profile = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": phase} for phase in frames]},
+            "profiles": [
+                {
+                    "type": "evented",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": end,
+                    "events": events,
+                }
+            ],
+            "name": name,
+            "exporter": "nbasim PhaseProfiler",
+        }
+        with open(path, "w") as f:
+            json.dump(profile, f)
@@ -1,11 +1,14 @@
-import pandas as pd
+import re
+from datetime import datetime
+import numpy as np
 
 
 def construct_calendar(df_games, season):
     """Construct/filter a calendar of games to get only the regular season games.
 
     Args:
-        df_games (pd.DataFrame): Table of games.
+        df_games (pd.DataFrame): Table of games, like the games of the season from
+        GamesData.season_games.
         season (int): Season to use as filter.
 
     Returns:
@@ -19,3 +22,33 @@ def construct_calendar(df_games, season):
     else:
         regular_season_calendar = season_games.iloc[:1230]
     return regular_season_calendar
+
+
+def played_games(game_ids, as_of):
+    """Find the games already played at a cutoff, to simulate only the other ones.
+
+    Args:
+        game_ids (np.array(str)): Games ids of the calendar, like 201810160BOS, which
+        start with the game date.
+        as_of (str): Cutoff, either a date (YYYYMMDD or YYYY-MM-DD), the games played
+        before this date being kept, or a game id of the calendar, the games up to this
+        one included being kept.
+
+    Returns:
+        np.array(bool): True for the games played at the cutoff.
+    """
+    as_of = str(as_of)
+    game_ids = np.asarray(game_ids, dtype=str)
+    if re.fullmatch(r"\d{8}|\d{4}-\d{2}-\d{2}", as_of):
+        date = as_of.replace("-", "")
+        try:
+            datetime.strptime(date, "%Y%m%d")
+        except ValueError:
+            raise ValueError(f"{as_of} is not a valid date.")
+        return game_ids.astype("U8") < date
+    if as_of not in game_ids:
+        raise ValueError(
+            f"{as_of} is neither a date (YYYYMMDD or YYYY-MM-DD) nor a game id of the "
+            "calendar."
+        )
+    return game_ids <= as_of
@@ -0,0 +1,236 @@
+import json
+from pathlib import Path
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utls.counters import ROUNDS, SimulationCounters
+
+# Key of the store description in the parquet files schema metadata.
+METADATA_KEY = b"nbasim"
+
+
+def _columns(n_teams, n_conferences, n_seeds):
+    """Names of the columns of a store.
+
+    Args:
+        n_teams (int): Number of teams.
+        n_conferences (int): Number of conferences.
+        n_seeds (int): Number of playoffs teams by conference.
+
+    Returns:
+        tuple(list(str), list(str), list(str)): Seeds, wins and rounds columns, the
+        champion one being "champion".
+    """
+    seeds = [
+        f"conf{c}_seed{r + 1}" for c in range(n_conferences) for r in range(n_seeds)
+    ]
+    wins = [f"wins_{t}" for t in range(n_teams)]
+    rounds = [f"rounds_{t}" for t in range(n_teams)]
+    return seeds, wins, rounds
+
+
+class ResultStore:
+    """Sink of the per-iteration results of a simulation, written to a folder of
+    parquet files. A row is one iteration, with fixed-width uint8 columns: champion id,
+    playoffs teams ids by conference and seed, and regular season wins and number of
+    playoffs rounds played (plus one for the champion) of each team id. Rows are
+    buffered and written by chunks of chunk_rows, one file each, so that the memory
+    used does not depend on the number of iterations.
+
+    Args:
+        path (str): Folder of the parquet files, created if needed.
+        team_names (list(str)): Teams names, indexed by team id.
+        max_wins (int): Maximum number of regular season wins of a team.
+        n_seeds (int, optional): Number of playoffs teams by conference. Defaults to 8.
+        chunk_rows (int, optional): Number of iterations of a file. Defaults to 100000.
+        prefix (str, optional): Prefix of the files names. Defaults to "part-".
+    """
+
+    def __init__(
+        self, path, team_names, max_wins, n_seeds=8, chunk_rows=100000, prefix="part-"
+    ):
+        if len(team_names) > 255 or max_wins > 255:
+            raise ValueError("Teams ids and wins must fit in uint8 columns.")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.team_names = list(team_names)
+        self.max_wins = max_wins
+        self.n_seeds = n_seeds
+        self.chunk_rows = chunk_rows
+        self.prefix = prefix
+        self.n_files = 0
+        self.n_children = 0
+        self.buffer = []
+        self.n_buffered = 0
+
+    def spawn(self):
+        """Create an empty store writing to the same folder with other files names,
+        like for a worker process.
+
+        Returns:
+            ResultStore: Child store.
+        """
+        child = ResultStore(
+            self.path,
+            self.team_names,
+            self.max_wins,
+            self.n_seeds,
+            self.chunk_rows,
+            prefix=f"{self.prefix}{self.n_children:03d}-",
+        )
+        self.n_children += 1
+        return child
+
+    def add(self, champions, seeds, wins, reached):
+        """Add the results of a batch of iterations, written when the buffer is full.
+
+        Args:
+            champions (np.array(int)): Champion id of each iteration.
+            seeds (np.array(int)): Playoffs teams ids of shape (n_iter, n_conferences,
+            n_seeds), by conference and rank.
+            wins (np.array(int)): Regular season wins of shape (n_iter, n_teams).
+            reached (np.array(int)): Number of playoffs rounds played by the teams,
+            plus one for the champion, of shape (n_iter, n_teams).
+        """
+        self.buffer.append(
+            (
+                np.asarray(champions, dtype=np.uint8),
+                np.asarray(seeds, dtype=np.uint8).reshape(len(seeds), -1),
+                np.asarray(wins, dtype=np.uint8),
+                np.asarray(reached, dtype=np.uint8),
+            )
+        )
+        self.n_buffered += len(champions)
+        if self.n_buffered >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered iterations to a new parquet file."""
+        if not self.buffer:
+            return
+        champions, seeds, wins, reached = (np.concatenate(x) for x in zip(*self.buffer))
+        self.buffer = []
+        self.n_buffered = 0
+        n_conferences = seeds.shape[1] // self.n_seeds
+        seeds_cols, wins_cols, rounds_cols = _columns(
+            len(self.team_names), n_conferences, self.n_seeds
+        )
+        arrays = [pa.array(champions)]
+        arrays += [pa.array(x) for x in seeds.T]
+        arrays += [pa.array(x) for x in wins.T]
+        arrays += [pa.array(x) for x in reached.T]
+        schema = pa.schema(
+            [
+                pa.field(name, pa.uint8())
+                for name in ["champion"] + seeds_cols + wins_cols + rounds_cols
+            ],
+            metadata={
+                METADATA_KEY: json.dumps(
+                    {
+                        "team_names": self.team_names,
+                        "max_wins": self.max_wins,
+                        "n_seeds": self.n_seeds,
+                        "n_conferences": n_conferences,
+                    }
+                )
+            },
+        )
+        table = pa.Table.from_arrays(arrays, schema=schema)
+        file_path = self.path / f"{self.prefix}{self.n_files:05d}.parquet"
+        pq.write_table(table, file_path)
+        self.n_files += 1
+
+
+def store_files(path):
+    """List the parquet files of a store.
+
+    Args:
+        path (str): Folder of the store.
+
+    Returns:
+        list(Path): Files, sorted by name.
+    """
+    return sorted(Path(path).glob("*.parquet"))
+
+
+def read_store_metadata(path):
+    """Read the description of a store.
+
+    Args:
+        path (str): Folder of the store.
+
+    Returns:
+        dict: Teams names, maximum number of wins, number of seeds and of conferences.
+    """
+    files = store_files(path)
+    if not files:
+        raise ValueError(f"No results found in {path}.")
+    metadata = pq.read_schema(files[0]).metadata
+    return json.loads(metadata[METADATA_KEY])
+
+
+def iter_store(path, columns=None):
+    """Read a store lazily, one row group of a file at a time.
+
+    Args:
+        path (str): Folder of the store.
+        columns (list(str), optional): Columns to read. Defaults to None (all of them).
+
+    Yields:
+        pa.Table: Iterations of a row group.
+    """
+    for file_path in store_files(path):
+        parquet_file = pq.ParquetFile(file_path)
+        for i in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(i, columns=columns)
+
+
+def _column(table, name):
+    # The columns are uint8 without nulls, read from their data buffers as the
+    # to_numpy of pyarrow imports pandas.
+    return np.concatenate(
+        [
+            np.frombuffer(
+                chunk.buffers()[1],
+                dtype=np.uint8,
+                count=len(chunk),
+                offset=chunk.offset,
+            )
+            for chunk in table.column(name).chunks
+        ]
+    ).astype(np.int64)
+
+
+def load_results_store(path):
+    """Aggregate the iterations of a store into the results of the simulation, reading
+    it lazily.
+
+    Args:
+        path (str): Folder of the store.
+
+    Returns:
+        tuple(dict, int, SimulationCounters): Dictionnary with team: number of time it
+        won the championship, number of iterations and counters of the iterations.
+    """
+    metadata = read_store_metadata(path)
+    team_names = metadata["team_names"]
+    n_teams = len(team_names)
+    n_seeds = metadata["n_seeds"]
+    seeds_cols, wins_cols, rounds_cols = _columns(
+        n_teams, metadata["n_conferences"], n_seeds
+    )
+    counters = SimulationCounters(team_names, metadata["max_wins"], n_seeds)
+    titles = np.zeros(n_teams, dtype=np.int64)
+    n_iter = 0
+    for table in iter_store(path):
+        champions = _column(table, "champion")
+        seeds = np.stack([_column(table, c) for c in seeds_cols], axis=1)
+        wins = np.stack([_column(table, c) for c in wins_cols], axis=1)
+        reached = np.stack([_column(table, c) for c in rounds_cols], axis=1)
+        rounds = np.stack(
+            [(reached > r).sum(axis=0) for r in range(len(ROUNDS))], axis=1
+        )
+        counters.add(seeds.reshape(len(seeds), -1, n_seeds), rounds, wins)
+        titles += np.bincount(champions, minlength=n_teams)
+        n_iter += len(champions)
+    return dict(zip(team_names, titles.tolist())), n_iter, counters
@@ -1,5 +1,9 @@
+import math
+import os
+from statistics import NormalDist
 from tabulate import tabulate
-import pandas as pd
+import numpy as np
+from utls.counters import ROUNDS
 
 
 def calculate_win_rate(wins, games):
@@ -13,13 +17,71 @@ def calculate_odd(wr, return_to_player=0.85):
         return None
 
 
-def process_results(dres, n_iter, save_path=None):
+def wilson_interval(wins, games, confidence=0.95):
+    """Wilson score confidence interval of a win rate.
+
+    Args:
+        wins (int): Number of wins.
+        games (int): Number of games.
+        confidence (float, optional): Confidence level. Defaults to 0.95.
+
+    Returns:
+        tuple(float, float): Lower and upper bounds of the interval.
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    wr = calculate_win_rate(wins, games)
+    denominator = 1 + z**2 / games
+    center = (wr + z**2 / (2 * games)) / denominator
+    half_width = (
+        z * math.sqrt(wr * (1 - wr) / games + z**2 / (4 * games**2)) / denominator
+    )
+    low = 0.0 if wins == 0 else center - half_width
+    high = 1.0 if wins == games else center + half_width
+    return low, high
+
+
+def max_half_width(dres, n_iter, confidence=0.95):
+    """Largest half-width of the teams probabilities of winning confidence intervals.
+
+    Args:
+        dres (dict): Dictionnary of results with team_name: number_of_wins as k: v.
+        n_iter (int): Number of iterations the simulation has ben run.
+        confidence (float, optional): Confidence level. Defaults to 0.95.
+
+    Returns:
+        float: Largest half-width.
+    """
+    intervals = [wilson_interval(v, n_iter, confidence) for v in dres.values()]
+    return max((high - low) / 2 for low, high in intervals)
+
+
+def print_partial_results(dres, n_done, n_iter, top=5):
+    """Print the teams with the highest probabilities of winning after part of the
+    simulations.
+
+    Args:
+        dres (dict): Dictionnary of results with team_name: number_of_wins as k: v.
+        n_done (int): Number of iterations done.
+        n_iter (int): Total number of iterations.
+        top (int, optional): Number of teams to print. Defaults to 5.
+    """
+    leaders = sorted(dres.items(), key=lambda x: -x[1])[:top]
+    leaders = ", ".join(f"{k} {calculate_win_rate(v, n_done):.3f}" for k, v in leaders)
+    print(f"{n_done}/{n_iter} simulations: {leaders}", flush=True)
+
+
+def process_results(dres, n_iter, save_path=None, confidence=None, counters=None):
     """Helper function to format the results of the simulations and print it.
     Additionnaly results can be saved in csv file.
 
     Args:
         dres (dict): Dictionnary of results with team_name: number_of_wins as k: v.
         n_iter (int): Number of iterations the simulation has ben run.
+        save_path (str, optional): Path of the csv file. Defaults to None.
+        confidence (float, optional): If set, add the bounds of the Wilson confidence
+        interval of the probability of winning at this level. Defaults to None.
+        counters (SimulationCounters, optional): If set, also process the seeds, rounds
+        and regular season wins distributions, see process_counters. Defaults to None.
     """
     lres = [[k, v] for k, v in dres.items()]
     names = [x[0] for x in lres]
@@ -35,7 +97,82 @@ def process_results(dres, n_iter, save_path=None):
         "Odd 100% RTP",
         "Odd 85% RTP",
     ]
+    if confidence is not None:
+        intervals = [wilson_interval(x[1], n_iter, confidence) for x in lres]
+        table = [row + interval for row, interval in zip(table, intervals)]
+        headers += [f"CI {confidence:.0%} low", f"CI {confidence:.0%} high"]
     print(tabulate(table, headers=headers))
     if save_path:
+        import pandas as pd
+
+        df = pd.DataFrame(table, columns=headers)
+        df.to_csv(save_path, index=False)
+    if counters is not None:
+        process_counters(counters, n_iter, save_path=save_path)
+
+
+def process_counters(counters, n_iter, save_path=None):
+    """Helper function to format the seeds, playoffs rounds and regular season wins
+    distributions of the simulations and print them. Additionnaly they can be saved in
+    csv files next to the results one, the wins file having the full distribution.
+
+    Args:
+        counters (SimulationCounters): Counters of the simulations.
+        n_iter (int): Number of iterations the simulation has ben run.
+        save_path (str, optional): Path of the results csv file, the counters being
+        saved with _seeds, _rounds and _wins suffixes. Defaults to None.
+    """
+    import pandas as pd
+
+    names = pd.Index(counters.team_names, name="Team Name")
+    seeds = pd.DataFrame(
+        counters.seeds / n_iter,
+        index=names,
+        columns=[f"Seed {i + 1}" for i in range(counters.n_seeds)] + ["Out"],
+    )
+    rounds = pd.DataFrame(counters.rounds / n_iter, index=names, columns=ROUNDS)
+    wins = pd.DataFrame(
+        counters.wins / n_iter, index=names, columns=range(counters.max_wins + 1)
+    )
+    cdf = counters.wins.cumsum(axis=1) / n_iter
+    wins_summary = pd.DataFrame(
+        {
+            "Average wins": counters.wins @ np.arange(counters.max_wins + 1) / n_iter,
+            "Wins 10%": (cdf < 0.1).sum(axis=1),
+            "Wins 50%": (cdf < 0.5).sum(axis=1),
+            "Wins 90%": (cdf < 0.9).sum(axis=1),
+        },
+        index=names,
+    )
+    for title, df in [
+        ("Seeds", seeds),
+        ("Playoffs rounds", rounds),
+        ("Regular season wins", wins_summary),
+    ]:
+        print(f"\n{title}:")
+        print(tabulate(df, headers="keys", floatfmt=".3f"))
+    if save_path:
+        stem = os.path.splitext(save_path)[0]
+        seeds.to_csv(f"{stem}_seeds.csv")
+        rounds.to_csv(f"{stem}_rounds.csv")
+        wins.to_csv(f"{stem}_wins.csv")
+
+
+def process_probabilities(dprob, save_path=None):
+    """Helper function to format exact probabilities of winning and print them.
+    Additionnaly results can be saved in csv file.
+
+    Args:
+        dprob (dict): Dictionnary of results with team_name: probability as k: v.
+        save_path (str, optional): Path of the csv file. Defaults to None.
+    """
+    table = [
+        [k, v, calculate_odd(v, 1.0), calculate_odd(v, 0.85)] for k, v in dprob.items()
+    ]
+    headers = ["Team Name", "Probability of winning", "Odd 100% RTP", "Odd 85% RTP"]
+    print(tabulate(table, headers=headers))
+    if save_path:
+        import pandas as pd
+
         df = pd.DataFrame(table, columns=headers)
         df.to_csv(save_path, index=False)
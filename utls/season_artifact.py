@@ -0,0 +1,204 @@
+import hashlib
+import json
+import numpy as np
+from pathlib import Path
+from utls.standings import Standings
+
+ARTIFACTS_FOLDER = "artifacts"
+SOURCE_FILES = ["BasketRefGames.snappy.parquet", "teams_info.csv"]
+
+
+def artifact_key(data_path, season_to_play, season_data):
+    """Compute the key of a season artifact from the source data files and the seasons.
+
+    Args:
+        data_path (str): Path to the data folder.
+        season_to_play (int): Season to play.
+        season_data (int): Season data to use as past scores.
+
+    Returns:
+        str: Key of the artifact.
+    """
+    h = hashlib.sha256(f"{season_to_play}-{season_data}".encode())
+    for f in SOURCE_FILES:
+        h.update(Path(data_path, f).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def artifact_path(data_path, season_to_play, season_data):
+    """Get the folder of a season artifact in the data folder.
+
+    Args:
+        data_path (str): Path to the data folder.
+        season_to_play (int): Season to play.
+        season_data (int): Season data to use as past scores.
+
+    Returns:
+        Path: Folder of the artifact.
+    """
+    key = artifact_key(data_path, season_to_play, season_data)
+    return (
+        Path(data_path)
+        / ARTIFACTS_FOLDER
+        / f"season_to_play_{season_to_play}_season_data_{season_data}_{key}"
+    )
+
+
+def prepare_season_artifact(data_path, season_to_play, season_data):
+    """Compile the calendar and teams data of a season pair into a folder of .npy
+    files, which can be memory-mapped by SeasonArtifact.
+
+    Args:
+        data_path (str): Path to the data folder.
+        season_to_play (int): Season to play.
+        season_data (int): Season data to use as past scores.
+
+    Returns:
+        Path: Folder of the artifact.
+    """
+    from utls.games_data import load_games_data
+    from utls.regular_season_calendar import construct_calendar
+
+    path = artifact_path(data_path, season_to_play, season_data)
+    games_data = load_games_data(data_path, seasons=[season_to_play, season_data])
+    team_names = games_data.teams_from_season(season_to_play)
+    team_ids = {t: i for i, t in enumerate(team_names)}
+    calendar = construct_calendar(
+        games_data.season_games(season_to_play), season_to_play
+    )
+    info = games_data.teams_info.set_index("team").loc[team_names]
+    conference_names, conferences = np.unique(info["conference"], return_inverse=True)
+    division_names, divisions = np.unique(info["division"], return_inverse=True)
+    # Same scores as the ones used by TeamsNaive to build the teams features.
+    scores = [games_data.season_scores[(season_to_play, t)] for t in team_names]
+    offsets = np.cumsum([0] + [len(pts) for pts, _ in scores])
+
+    arrays = {
+        "game_ids": calendar["game_id"].values.astype(str),
+        "home_ids": calendar["home_name"].map(team_ids).values.astype(np.int16),
+        "away_ids": calendar["away_name"].map(team_ids).values.astype(np.int16),
+        "ylabel": calendar["ylabel"].values.astype(np.int8),
+        "team_names": np.asarray(team_names, dtype=str),
+        "previous_team_names": np.asarray(
+            games_data.teams_from_season(season_data), dtype=str
+        ),
+        "conference_names": conference_names.astype(str),
+        "conferences": conferences.astype(np.int8),
+        "division_names": division_names.astype(str),
+        "divisions": divisions.astype(np.int8),
+        "pts": np.concatenate([pts for pts, _ in scores]).astype(np.int16),
+        "opp_pts": np.concatenate([opp for _, opp in scores]).astype(np.int16),
+        "offsets": offsets.astype(np.int64),
+    }
+    path.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(path / f"{name}.npy", array)
+    meta = {
+        "season_to_play": season_to_play,
+        "season_data": season_data,
+        "key": path.name.rsplit("_", 1)[-1],
+    }
+    (path / "meta.json").write_text(json.dumps(meta))
+    return path
+
+
+class SeasonArtifact:
+    """Season pair data compiled by prepare_season_artifact. Arrays are memory-mapped,
+    so that no pandas processing is needed to start a simulation. It can be used in
+    place of a GamesData to build the teams.
+
+    Args:
+        path (str): Folder of the artifact.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        meta = json.loads((self.path / "meta.json").read_text())
+        self.season_to_play = meta["season_to_play"]
+        self.season_data = meta["season_data"]
+        self.game_ids = self._load("game_ids")
+        self.home_ids = self._load("home_ids")
+        self.away_ids = self._load("away_ids")
+        self.ylabel = self._load("ylabel")
+        self.team_names = self._load_names("team_names")
+        self.previous_team_names = self._load_names("previous_team_names")
+        self.conferences = self._load("conference_names")[self._load("conferences")]
+        self.conferences = self.conferences.tolist()
+        self.divisions = self._load("division_names")[self._load("divisions")]
+        self.divisions = self.divisions.tolist()
+        self.pts = self._load("pts")
+        self.opp_pts = self._load("opp_pts")
+        self.offsets = self._load("offsets")
+        self.season_scores = {
+            (self.season_to_play, t): (
+                self.pts[self.offsets[i] : self.offsets[i + 1]],
+                self.opp_pts[self.offsets[i] : self.offsets[i + 1]],
+            )
+            for i, t in enumerate(self.team_names)
+        }
+
+    def _load(self, name):
+        return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+    def _load_names(self, name):
+        return np.array(self._load(name).tolist(), dtype=object)
+
+    @property
+    def teams_info(self):
+        """Teams info for conference and division, as in teams_info.csv."""
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                "team": self.team_names,
+                "conference": self.conferences,
+                "division": self.divisions,
+            }
+        )
+
+    def teams_from_season(self, season):
+        """Extract teams name from one of the two seasons of the artifact.
+
+        Args:
+            season (int): Season from which to extract the teams.
+
+        Returns:
+            np.array(str): Teams name.
+        """
+        if season == self.season_to_play:
+            return self.team_names
+        if season == self.season_data:
+            return self.previous_team_names
+        raise ValueError(f"Season {season} is not in the artifact.")
+
+    def standings(self):
+        """Build the standings engine of the calendar.
+
+        Returns:
+            Standings: Standings engine of the calendar.
+        """
+        return Standings(
+            self.home_ids,
+            self.away_ids,
+            self.team_names,
+            self.conferences,
+            self.divisions,
+        )
+
+
+def load_season_artifact(data_path, season_to_play, season_data):
+    """Open the artifact of a season pair, if it has been prepared from the current
+    data files.
+
+    Args:
+        data_path (str): Path to the data folder.
+        season_to_play (int): Season to play.
+        season_data (int): Season data to use as past scores.
+
+    Returns:
+        SeasonArtifact: The artifact, None if it has not been prepared.
+    """
+    path = artifact_path(data_path, season_to_play, season_data)
+    if not (path / "meta.json").exists():
+        return None
+    return SeasonArtifact(path)
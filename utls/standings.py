@@ -0,0 +1,420 @@
+from collections import OrderedDict
+import numpy as np
+from utls.profiler import NullProfiler
+
+
+class Standings:
+    """Standings engine to rank the teams at the end of a regular season from the games
+    results. Teams are integer ids and results are stored in head-to-head wins matrices,
+    so that tie-breakers run on small arrays instead of DataFrames. The ranking and the
+    tie-breakers rules are the same as get_playoffs ones.
+
+    Args:
+        home_ids (np.array(int)): Home teams ids of the calendar games.
+        away_ids (np.array(int)): Away teams ids of the calendar games.
+        team_names (list(str)): Teams names, indexed by team id.
+        conferences (list(str)): Conference of each team, indexed by team id.
+        divisions (list(str)): Division of each team, indexed by team id.
+        fixed_h2h (np.array(int), optional): Head-to-head wins matrix of games already
+        played, added to the one of the calendar games. Defaults to None.
+    """
+
+    SUBSETS_CACHE_SIZE = 100000
+
+    def __init__(
+        self, home_ids, away_ids, team_names, conferences, divisions, fixed_h2h=None
+    ):
+        self.home_ids = np.asarray(home_ids, dtype=np.int64)
+        self.away_ids = np.asarray(away_ids, dtype=np.int64)
+        self.team_names = list(team_names)
+        self.conferences = list(conferences)
+        self.divisions = list(divisions)
+        self.n_teams = len(self.team_names)
+        self.fixed_h2h = fixed_h2h
+        # Profiler timing the tie-breakers rules, see PhaseProfiler.
+        self.profiler = NullProfiler()
+        # Number of games of each team, the maximum number of wins.
+        self.n_games = np.bincount(
+            np.concatenate((self.home_ids, self.away_ids)), minlength=self.n_teams
+        )
+        if fixed_h2h is not None:
+            self.n_games += fixed_h2h.sum(axis=0) + fixed_h2h.sum(axis=1)
+        # Cell of the head-to-head matrix (winner, loser) incremented by each game.
+        self.home_win_cells = self.home_ids * self.n_teams + self.away_ids
+        self.away_win_cells = self.away_ids * self.n_teams + self.home_ids
+        # Teams of each conference in alphabetical order, like in get_playoffs.
+        self.conferences_teams = {}
+        for t in sorted(range(self.n_teams), key=lambda x: self.team_names[x]):
+            self.conferences_teams.setdefault(self.conferences[t], []).append(t)
+        # Number of games between each pair of teams, known from the calendar, so that
+        # only the wins of a subset of teams depend on the simulated results.
+        pair_games = np.zeros((self.n_teams, self.n_teams), dtype=np.int64)
+        np.add.at(pair_games, (self.home_ids, self.away_ids), 1)
+        if fixed_h2h is not None:
+            pair_games += fixed_h2h
+        self.pair_games = (pair_games + pair_games.T).tolist()
+        # Number of games played among the teams subsets of the tie-breakers, and
+        # division winners of the conference being ranked.
+        self._subsets_games = OrderedDict()
+        self._division_leaders = {}
+
+    @classmethod
+    def from_calendar(cls, games_calendar, teams_info, team_ids):
+        """Build the standings engine from a games calendar.
+
+        Args:
+            games_calendar (pd.DataFrame): Calendar of the regular season games.
+            teams_info (pd.DataFrame): Teams info for conference and division.
+            team_ids (dict): Dictionnary of k: v with k the team name and v its id.
+
+        Returns:
+            Standings: Standings engine of the calendar.
+        """
+        team_names = sorted(team_ids, key=team_ids.get)
+        info = teams_info.set_index("team").loc[team_names]
+        return cls(
+            games_calendar["home_name"].map(team_ids).values,
+            games_calendar["away_name"].map(team_ids).values,
+            team_names,
+            info["conference"].values,
+            info["division"].values,
+        )
+
+    def given_results(self, played, ylabel):
+        """Build the standings engine of the games left to play, the results of the
+        played ones being fixed. Their head-to-head wins are counted once, so that only
+        the remaining games are counted for each simulated season.
+
+        Args:
+            played (np.array(bool)): True for the calendar games already played.
+            ylabel (np.array(int)): Games results of the calendar, 1 if home team wins
+            else 0. Only the ones of the played games are used.
+
+        Returns:
+            Standings: Standings engine of the remaining games.
+        """
+        played = np.asarray(played, dtype=bool)
+        info = (self.team_names, self.conferences, self.divisions)
+        fixed = Standings(self.home_ids[played], self.away_ids[played], *info)
+        fixed_h2h = fixed.head_to_head(np.asarray(ylabel)[played])
+        if self.fixed_h2h is not None:
+            fixed_h2h += self.fixed_h2h
+        return Standings(
+            self.home_ids[~played], self.away_ids[~played], *info, fixed_h2h=fixed_h2h
+        )
+
+    def head_to_head(self, ylabel):
+        """Count the wins of each team against each other team, including the fixed
+        ones.
+
+        Args:
+            ylabel (np.array(int)): Games results, 1 if home team wins else 0. Its shape
+            is (n_games,) or (n_seasons, n_games).
+
+        Returns:
+            np.array(int): Matrix of shape (n_teams, n_teams), or (n_seasons, n_teams,
+            n_teams), with the number of wins of the row team against the column team.
+        """
+        ylabel = np.asarray(ylabel)
+        cells = np.where(ylabel == 1, self.home_win_cells, self.away_win_cells)
+        n_cells = self.n_teams * self.n_teams
+        cells = cells.reshape(int(np.prod(cells.shape[:-1])), cells.shape[-1])
+        cells = cells + n_cells * np.arange(cells.shape[0])[:, None]
+        h2h = np.bincount(cells.ravel(), minlength=n_cells * cells.shape[0])
+        h2h = h2h.reshape(ylabel.shape[:-1] + (self.n_teams, self.n_teams))
+        if self.fixed_h2h is not None:
+            h2h += self.fixed_h2h
+        return h2h
+
+    @staticmethod
+    def _sort_by_wins(teams, wins):
+        """Sort teams by descending number of wins. Teams with the same number of wins
+        are ordered the same way as sort_values(by=["counts"], ascending=False) does in
+        get_playoffs, which is not a stable sort.
+
+        Args:
+            teams (list(int)): Teams to sort.
+            wins (list(int)): Number of wins by team id.
+
+        Returns:
+            list(int): Sorted teams.
+        """
+        counts = np.array([wins[t] for t in teams], dtype=np.int64)
+        order = np.arange(len(teams))[::-1][counts[::-1].argsort()][::-1]
+        return [teams[i] for i in order]
+
+    def _subset_games(self, teams_subset):
+        """Number of games played between teams of a subset, which does not depend on
+        the results. Subsets come back from one season to the other, so the counts are
+        kept in a least recently used cache of SUBSETS_CACHE_SIZE subsets.
+
+        Args:
+            teams_subset (list(int)): Teams of the subset.
+
+        Returns:
+            int: Number of games.
+        """
+        key = frozenset(teams_subset)
+        n_games = self._subsets_games.get(key)
+        if n_games is not None:
+            self._subsets_games.move_to_end(key)
+            return n_games
+        if len(self._subsets_games) >= self.SUBSETS_CACHE_SIZE:
+            self._subsets_games.popitem(last=False)
+        pair_games = self.pair_games
+        n_games = sum(pair_games[a][b] for a in key for b in key) // 2
+        self._subsets_games[key] = n_games
+        return n_games
+
+    def _better_winning_pctg(self, h2h, teams_subset, tie_teams):
+        """Same as better_winning_pctg_tied_teams, games being the ones played between
+        teams of teams_subset.
+
+        Args:
+            h2h (list(list(int))): Head-to-head wins matrix.
+            teams_subset (list(int)): Teams whose games against each other are used.
+            tie_teams (list(int)): Tied teams.
+
+        Returns:
+            list(int): Top teams among the tied ones if some have a higher result than
+            other. Otherwise, the original tie_teams.
+        """
+        n_games = self._subset_games(teams_subset)
+        scores = []
+        for team in tie_teams:
+            wins = 0
+            if team in teams_subset:
+                row = h2h[team]
+                wins = sum(row[t] for t in teams_subset)
+            scores.append(round(wins / n_games, 2) if n_games > 0 else wins)
+        max_pctg = max(scores)
+        return [team for team, score in zip(tie_teams, scores) if score == max_pctg]
+
+    def _division_winners(self, conference_full, wins, tie_teams):
+        """Same as division_winners.
+
+        Args:
+            conference_full (list(int)): Conference teams ranked by number of wins.
+            wins (list(int)): Number of wins by team id.
+            tie_teams (list(int)): Tied teams.
+
+        Returns:
+            list(int): Top teams among the tied ones if at least one but not all teams,
+            is a division winner. Otherwise, return the original tie_teams.
+        """
+        div_winners = []
+        for team in tie_teams:
+            division = self.divisions[team]
+            # The winner of a division is the same for all the ties of the conference.
+            winner = self._division_leaders.get(division)
+            if winner is None:
+                division_teams = [
+                    t for t in conference_full if self.divisions[t] == division
+                ]
+                winner = self._sort_by_wins(division_teams, wins)[0]
+                self._division_leaders[division] = winner
+            div_winners.append(winner == team)
+        if (sum(div_winners) == len(tie_teams)) or (sum(div_winners) == 0):
+            return tie_teams
+        return [team for team, win in zip(tie_teams, div_winners) if win]
+
+    def _division_and_conference_teams(self, conference_remaining, conference, team):
+        """Teams used for the division and conference records tie-breakers, picked
+        among the remaining teams of the conference like get_playoffs does.
+        """
+        div_teams = [
+            t for t in conference_remaining if self.divisions[t] == self.divisions[team]
+        ]
+        conf_teams = [
+            t for t in conference_remaining if self.divisions[t] == conference
+        ]
+        return div_teams, conf_teams
+
+    def _rule(self, name, rule, *args):
+        """Apply a tie-breaker rule, timed by the profiler.
+
+        Args:
+            name (str): Name of the rule.
+            rule (callable): Rule to apply.
+
+        Returns:
+            Result of the rule.
+        """
+        if not self.profiler.enabled:
+            return rule(*args)
+        with self.profiler.phase(f"tie-breaker {name}"):
+            return rule(*args)
+
+    def _tie_two_teams(
+        self, h2h, wins, conference_full, conference_remaining, conference, tie_teams
+    ):
+        """Same as tie_two_teams.
+
+        Returns:
+            int: Top team among the tied ones.
+        """
+        # Better winning percentage in games against each other.
+        tie_teams = self._rule(
+            "head-to-head", self._better_winning_pctg, h2h, tie_teams, tie_teams
+        )
+        if len(tie_teams) == 1:
+            return tie_teams[0]
+        # Division winner.
+        tie_teams = self._rule(
+            "division winner", self._division_winners, conference_full, wins, tie_teams
+        )
+        if len(tie_teams) == 1:
+            return tie_teams[0]
+        div_teams, conf_teams = self._division_and_conference_teams(
+            conference_remaining, conference, tie_teams[0]
+        )
+        # Better winning percentage against teams in own division.
+        tie_teams = self._rule(
+            "division record", self._better_winning_pctg, h2h, div_teams, tie_teams
+        )
+        if len(tie_teams) == 1:
+            return tie_teams[0]
+        # Better winning percentage against teams in own conference.
+        tie_teams = self._rule(
+            "conference record", self._better_winning_pctg, h2h, conf_teams, tie_teams
+        )
+        if len(tie_teams) == 1:
+            return tie_teams[0]
+        # Not implemented: Shuffle
+        self._rule("shuffle", np.random.shuffle, tie_teams)
+        return tie_teams[0]
+
+    def _tie_three_teams(
+        self, h2h, wins, conference_full, conference_remaining, conference, tie_teams
+    ):
+        """Same as tie_three_teams. When a criterion leaves two teams, tie_two_teams is
+        run without using its result, it is run here too to draw the same random numbers.
+
+        Returns:
+            int: Top team among the tied ones.
+        """
+        args = (h2h, wins, conference_full, conference_remaining, conference)
+        # Division winner.
+        tie_teams = self._rule(
+            "division winner", self._division_winners, conference_full, wins, tie_teams
+        )
+        if len(tie_teams) == 2:
+            self._tie_two_teams(*args, tie_teams)
+        if len(tie_teams) == 1:
+            return tie_teams[0]
+        # Better winning percentage in all games among the tied teams.
+        tie_teams = self._rule(
+            "head-to-head", self._better_winning_pctg, h2h, tie_teams, tie_teams
+        )
+        if len(tie_teams) == 2:
+            self._tie_two_teams(*args, tie_teams)
+        if len(tie_teams) == 1:
+            return tie_teams[0]
+        div_teams, conf_teams = self._division_and_conference_teams(
+            conference_remaining, conference, tie_teams[0]
+        )
+        # Better winning percentage against teams in own division, then against teams
+        # in own conference.
+        for rule, teams_subset in [
+            ("division record", div_teams),
+            ("conference record", conf_teams),
+        ]:
+            tie_teams = self._rule(
+                rule, self._better_winning_pctg, h2h, teams_subset, tie_teams
+            )
+            if len(tie_teams) == 2:
+                self._tie_two_teams(*args, tie_teams)
+            if len(tie_teams) == 1:
+                return tie_teams[0]
+        # Not implemented: Shuffle
+        self._rule("shuffle", np.random.shuffle, tie_teams)
+        return tie_teams[0]
+
+    def _top_eight_conference(self, h2h, wins, conference):
+        """Same as get_top_eight_conference.
+
+        Args:
+            h2h (list(list(int))): Head-to-head wins matrix.
+            wins (list(int)): Number of wins by team id.
+            conference (str): Conference to process.
+
+        Returns:
+            list(int): List of the top eight ranked teams who will play the playoffs.
+        """
+        self._division_leaders = {}
+        conference_full = self._sort_by_wins(self.conferences_teams[conference], wins)
+        conference_remaining = list(conference_full)
+        ranks = []
+        while len(ranks) < 8:
+            top_score = wins[conference_remaining[0]]
+            tie_teams = [t for t in conference_remaining if wins[t] == top_score]
+            if len(tie_teams) == 1:
+                team = tie_teams[0]
+            elif len(tie_teams) == 2:
+                team = self._tie_two_teams(
+                    h2h,
+                    wins,
+                    conference_full,
+                    conference_remaining,
+                    conference,
+                    tie_teams,
+                )
+            else:
+                team = self._tie_three_teams(
+                    h2h,
+                    wins,
+                    conference_full,
+                    conference_remaining,
+                    conference,
+                    tie_teams,
+                )
+            ranks.append(team)
+            conference_remaining.remove(team)
+        return ranks
+
+    def _rank(self, h2h):
+        """Rank the teams of each conference from a head-to-head wins matrix.
+
+        Args:
+            h2h (np.array(int)): Head-to-head wins matrix of shape (n_teams, n_teams).
+
+        Returns:
+            dict: Dictionnary of k: v with k the conference and v the ranked teams list to
+            play the playoffs.
+        """
+        wins = h2h.sum(axis=1).tolist()
+        # Tie-breakers only read a few cells, faster from lists than from an array.
+        h2h = h2h.tolist()
+        playoffs = {}
+        for conf in self.conferences_teams:
+            ranks = self._top_eight_conference(h2h, wins, conf)
+            playoffs[conf] = [self.team_names[t] for t in ranks]
+        return playoffs
+
+    def get_playoffs(self, ylabel):
+        """Get the teams who will play the playoffs from the results of the calendar
+        games.
+
+        Args:
+            ylabel (np.array(int)): Games results, 1 if home team wins else 0.
+
+        Returns:
+            tuple(dict, np.array(int)): Dictionnary of k: v with k the conference and v the
+            ranked teams list to play the playoffs, number of wins by team id.
+        """
+        h2h = self.head_to_head(ylabel)
+        return self._rank(h2h), h2h.sum(axis=1)
+
+    def get_playoffs_many(self, ylabel):
+        """Get the teams who will play the playoffs for many simulated seasons at once.
+
+        Args:
+            ylabel (np.array(int)): Games results of shape (n_seasons, n_games), 1 if home
+            team wins else 0.
+
+        Returns:
+            tuple(list(dict), np.array(int)): Playoffs teams ranked of each season, number
+            of wins by team id of shape (n_seasons, n_teams).
+        """
+        h2h = self.head_to_head(ylabel)
+        return [self._rank(x) for x in h2h], h2h.sum(axis=2)